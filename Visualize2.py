@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
 import os
-from main2 import load_true_betweenness
+import numpy as np
+from results_store import averaged_top_nodes, select
 
 def plot_error_comparison(graph_name, c_list, output_folder):
     """
@@ -9,31 +10,17 @@ def plot_error_comparison(graph_name, c_list, output_folder):
     # Plot the errors
     plt.figure(figsize=(12, 6))
     x = range(1, 31)  # Top 30 nodes
-    true_bc_file_path = os.path.join('BetweennessCentrality', f'betweenness_centrality_{graph_name}.txt')
-    true_bc = load_true_betweenness(true_bc_file_path)
-
-    # Sort nodes by true BC values and select the top 30 nodes
-    top_nodes = sorted(true_bc, key=true_bc.get, reverse=True)[:30]
 
+    # Repetition averages of the top 30 nodes (by true BC) for every c, from the results store
+    averages = averaged_top_nodes([graph_name], c_list, variant='ResultsAlt3', top=30)
     for c in c_list:
-        averaged_file = os.path.join(output_folder, f'{graph_name}_averaged_results3_c{c}.txt')
-        with open(averaged_file, 'r') as f:
-            lines = f.readlines()[1:]  # Skip the header
-            averaged_results = {int(line.split()[0]): float(line.split()[1]) for line in lines}
-        
-        # Calculate error for top nodes
-        error_values = []
-        for node in top_nodes:
-            true_value = true_bc[node]
-            approx_value = averaged_results.get(int(node), 0)
-            print(approx_value)
-            if true_value != 0:
-                error = abs((true_value - approx_value) / true_value) * 100  # Percentage error
-            else:
-                error = 0  # Handle division by zero
-            error_values.append(error)
+        rows = select(averages, c=c)
+        true_value, approx_value = rows['true_bc'], rows['approx_bc']
+        # Percentage error, 0 where the true BC is 0
+        error_values = np.divide(np.abs(true_value - approx_value) * 100, true_value,
+                                 out=np.zeros_like(true_value), where=true_value != 0)
 
-        plt.plot(x, error_values, label=f'Error (c={c})', marker='x')
+        plt.plot(x[:len(error_values)], error_values, label=f'Error (c={c})', marker='x')
 
     plt.title(f'Error Comparison for {graph_name}')
     plt.xlabel('Top 30 Nodes')
@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+
+from top_k import confidence_radius
+
+
+class Snapshot:
+    """Running BC estimates of the target nodes after a number of samples.
+
+    estimate[i] is the estimate for the i-th target, normalized like the true BC files, and
+    radius[i] the half-width of its confidence interval, so the true value lies in
+    [lower[i], upper[i]]. elapsed is the time in seconds since the stream was started.
+    """
+
+    __slots__ = ('samples', 'elapsed', 'estimate', 'radius')
+
+    def __init__(self, samples, elapsed, estimate, radius):
+        self.samples = samples
+        self.elapsed = elapsed
+        self.estimate = estimate
+        self.radius = radius
+
+    @property
+    def lower(self):
+        return np.maximum(self.estimate - self.radius, 0)
+
+    @property
+    def upper(self):
+        return self.estimate + self.radius
+
+
+def running_estimates(batches, n, every=256, delta=0.05, bound='bernstein', max_samples=None, value_range=None,
+                      per_node=False):
+    """Consume dependency batches and yield a Snapshot of the targets after every `every` samples.
+
+    The columns of the batches are the targets. Every sample is scaled into [0, 1] by
+    value_range, the largest value a sample can take (n - 2 for the dependency of a source).
+    The failure probability is split over the targets and the snapshots, so with probability
+    at least 1 - delta every interval of every snapshot holds at once: the caller may stop at
+    whichever snapshot it likes, e.g. once the intervals are narrow enough or a time budget is
+    spent, without losing the guarantee. With per_node the failure probability is only split
+    over the snapshots, so each target's intervals hold at every snapshot with probability
+    1 - delta; by the union bound all of them hold with probability at least 1 - delta * t for
+    t targets, and at most delta * t targets are expected outside their intervals. With
+    max_samples a last snapshot is yielded after that many samples and the stream ends;
+    otherwise it runs until the generator is closed.
+    """
+    scale = 1 / max(n - 2 if value_range is None else value_range, 1)
+    to_bc = n / ((n - 1) * (n - 2) * scale) if n > 2 else 0.0  # mean scaled dependency -> normalized BC
+    start_time = time.time()
+    S = squares = None
+    samples = 0
+    snapshot = 0
+    next_snapshot = every if max_samples is None else min(every, max_samples)
+    try:
+        while True:
+            rows = next(batches)
+            if S is None:
+                S = np.zeros(rows.shape[1])
+                squares = np.zeros(rows.shape[1])
+            position = 0
+            while position < len(rows):
+                # Split the batch where a snapshot is due, so snapshots fall on exact sample counts
+                deltas = rows[position:position + next_snapshot - samples] * scale
+                S += deltas.sum(axis=0)
+                squares += (deltas * deltas).sum(axis=0)
+                samples += len(deltas)
+                position += len(deltas)
+                if samples < next_snapshot:
+                    continue
+                snapshot += 1
+                mean = S / samples
+                variance = np.maximum(squares / samples - mean * mean, 0)
+                failure = delta / ((1 if per_node else len(S)) * snapshot * (snapshot + 1))
+                radius = confidence_radius(samples, variance, failure, bound)
+                yield Snapshot(samples, time.time() - start_time, mean * to_bc, radius * to_bc)
+                if max_samples is not None and samples >= max_samples:
+                    return
+                next_snapshot = samples + every if max_samples is None else min(samples + every, max_samples)
+    finally:
+        batches.close()
@@ -0,0 +1,231 @@
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+
+import main
+from csr_graph import CSRGraph
+from exact_bc import exact_betweenness
+from graph_cache import load_graph
+from main2 import GraphCentralityCalculator
+from profiling import peak_rss_bytes
+from source_samplers import SAMPLERS
+from test import sample_betweenness
+from true_bc import load_true_betweenness, true_bc_path
+
+BENCHMARK_DIR = 'Benchmarks'  # Folder holding the baseline and the results of every run
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+GRAPHS = ('Rand', 'Pref-attach', 'Road', 'Crawl', 'Cite')  # graphs of GraphsNetworkX with a true BC file
+SYNTHETIC = {f'ER-{n}': (n, 4 * n) for n in (1000, 4000, 16000)}  # G(n, m) graphs, with Rand's average degree
+WEIGHTED = {'Road-weighted': 'Road'}  # corpus graphs kept weighted (Dijkstra), scored against their weighted true BC
+HOP_ONLY = ('pairs', 'sampler-msbfs', 'sampler-sparse')  # refuse weights, or fall back to the same Dijkstra as 'bfs'
+TOP = 30  # the errors are measured on the nodes with the highest true BC, like the experiments
+
+
+def calculator_estimator(shared, pairs=False, sampler='uniform'):
+    """An estimator running main2's GraphCentralityCalculator.approximate_BC on a fresh calculator."""
+    def estimate(graph, top_ids, c, seed):
+        calculator = GraphCentralityCalculator(graph, 'benchmark')
+        top_nodes = [graph.labels[i] for i in top_ids.tolist()]
+        _, _, betweenness3, num_SSP_dict, _ = calculator.approximate_BC(c, top_nodes, shared, seed=seed,
+                                                                         pairs=pairs, sampler=sampler)
+        n = graph.number_of_nodes()
+        k = np.array([num_SSP_dict[node] for node in top_nodes])
+        # One stream is shared by all nodes, or every node has its own
+        samples = int(k.max()) if shared else int(k.sum())
+        return np.array([betweenness3[node] for node in top_nodes]) / ((n - 1) * (n - 2)), samples
+    return estimate
+
+
+def main_estimator(shared):
+    """An estimator running main.py's GraphCentralityCalculator.approximate_BC on the top nodes."""
+    def estimate(graph, top_ids, c, seed):
+        calculator = main.GraphCentralityCalculator(graph, 'benchmark')
+        top_nodes = [graph.labels[i] for i in top_ids.tolist()]
+        _, betweennessAlt, num_SSP_dict, _ = calculator.approximate_BC(c, shared, seed=seed, nodes=top_nodes)
+        n = graph.number_of_nodes()
+        k = np.array([num_SSP_dict[node] for node in top_nodes])
+        samples = int(k.max()) if shared else int(k.sum())
+        return np.array([betweennessAlt[node] for node in top_nodes]) / ((n - 1) * (n - 2)), samples
+    return estimate
+
+
+def sampler_estimator(backend):
+    """An estimator running test.py's sampler (sample_betweenness) with the given batch_dependencies backend.
+
+    Every sample is added to every node until the top nodes have all reached c * n.
+    """
+    def estimate(graph, top_ids, c, seed):
+        n = graph.number_of_nodes()
+        S, k = sample_betweenness(graph, c, top_ids, seed=seed, backend=backend)
+        return S[top_ids] * n / (k * (n - 1) * (n - 2)), k
+    return estimate
+
+
+def exact_estimator(graph, top_ids, c, seed):
+    """The exact baseline: Brandes from every node (c and seed play no part)."""
+    return exact_betweenness(graph)[top_ids], graph.number_of_nodes()
+
+
+ESTIMATORS = {
+    'shared': calculator_estimator(shared=True),
+    'per_node': calculator_estimator(shared=False),
+    'pairs': calculator_estimator(shared=True, pairs=True),
+    'main-shared': main_estimator(shared=True),
+    'main-per_node': main_estimator(shared=False),
+    'sampler-msbfs': sampler_estimator('msbfs'),
+    'sampler-sparse': sampler_estimator('sparse'),
+    'sampler-bfs': sampler_estimator('bfs'),
+    'exact': exact_estimator,
+}
+ESTIMATORS.update({f'shared-{sampler}': calculator_estimator(shared=True, sampler=sampler) for sampler in SAMPLERS[1:]})
+ESTIMATORS['per_node-distance'] = calculator_estimator(shared=False, sampler='distance')  # a sampler per node
+
+
+def load_case(name):
+    """The CSRGraph and the true BC (indexed by node id) of a corpus graph, a SYNTHETIC or a WEIGHTED one.
+
+    The corpus graphs are scored on hop counts, also Road and Cite, so their edge weights are
+    dropped; the WEIGHTED cases keep them and use the weighted true BC file.
+    """
+    if name in SYNTHETIC:
+        n, m = SYNTHETIC[name]
+        graph = CSRGraph.from_networkx(nx.gnm_random_graph(n, m, seed=n))
+        return graph, exact_betweenness(graph)
+    if name in WEIGHTED:
+        graph = load_graph(os.path.join('GraphsNetworkX', f'{WEIGHTED[name]}.graphml'))
+        return graph, load_true_betweenness(true_bc_path(WEIGHTED[name], weighted=True)).aligned(graph)
+    graph = load_graph(os.path.join('GraphsNetworkX', f'{name}.graphml'), weighted=False)
+    return graph, load_true_betweenness(true_bc_path(name)).aligned(graph)
+
+
+def benchmark_case(estimate, graph, true_bc, c, reps):
+    """Time reps seeded runs of one estimator on one graph, after an untimed run that measures memory.
+
+    The warm-up run (seed 0) is traced with tracemalloc for the peak of the Python allocations;
+    the timed runs use seeds 1 to reps and are not traced. The error is the relative error on
+    the TOP nodes with the highest true BC, averaged over the timed runs.
+    """
+    top_ids = np.argsort(-true_bc, kind='stable')[:TOP]
+    truth = true_bc[top_ids]
+    tracemalloc.start()
+    try:
+        estimate(graph, top_ids, c, 0)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies, rates, errors = [], [], []
+    for seed in range(1, reps + 1):
+        start_time = time.perf_counter()
+        estimates, samples = estimate(graph, top_ids, c, seed)
+        latency = time.perf_counter() - start_time
+        latencies.append(latency)
+        rates.append(samples / latency)
+        errors.append(np.abs(estimates - truth) / np.where(truth > 0, truth, 1))
+    errors = np.array(errors)
+    return {
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p90': float(np.percentile(latencies, 90)),
+        'latency_max': float(max(latencies)),
+        'samples_per_second': float(np.median(rates)),
+        'traced_peak_bytes': int(peak),
+        'mean_error': float(errors.mean()),
+        'max_error': float(errors.max()),
+    }
+
+
+def run_suite(graphs=GRAPHS + tuple(SYNTHETIC) + tuple(WEIGHTED), estimators=tuple(ESTIMATORS), c=2, reps=3):
+    """Benchmark every estimator on every graph; returns {'meta': ..., 'cases': {'graph/estimator': metrics}}.
+
+    Estimators whose optional dependency is missing (SciPy for 'sampler-sparse') are skipped,
+    and so are the HOP_ONLY ones on weighted graphs.
+    Every case takes a traced warm-up run and reps timed ones, so the full suite takes a while;
+    pass fewer graphs or estimators for a quick check.
+    """
+    cases = {}
+    for name in graphs:
+        graph, true_bc = load_case(name)
+        for estimator in estimators:
+            if graph.weighted and estimator in HOP_ONLY:
+                continue
+            try:
+                metrics = benchmark_case(ESTIMATORS[estimator], graph, true_bc, c, reps)
+            except ImportError as e:
+                print(f"Skipping {name}/{estimator}: {e}")
+                continue
+            cases[f'{name}/{estimator}'] = metrics
+            print(f"{name}/{estimator}: {metrics['latency_p50']:.3f} s median, "
+                  f"{metrics['samples_per_second']:.0f} samples/s, {metrics['traced_peak_bytes'] / 2**20:.1f} MiB, "
+                  f"{metrics['mean_error']:.2%} mean error")
+    meta = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'c': c, 'reps': reps, 'machine': platform.node(),
+            'python': platform.python_version(), 'numpy': np.__version__, 'cpus': os.cpu_count(),
+            'peak_rss_bytes': peak_rss_bytes()}
+    return {'meta': meta, 'cases': cases}
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(results, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def machine_fingerprint(meta):
+    """What has to match for timings to be comparable: the machine's name and its number of CPUs."""
+    return meta.get('machine'), meta.get('cpus')
+
+
+def compare_to_baseline(results, baseline, time_tolerance=0.25, memory_tolerance=0.25, error_tolerance=0.02,
+                        timings=True):
+    """List every case that got worse than the baseline by more than the tolerances.
+
+    Median latency and traced memory may grow by a fraction time_tolerance and
+    memory_tolerance, the mean relative error by error_tolerance (absolute). Cases the baseline
+    does not have are not compared, and neither are latencies when timings is False.
+    """
+    regressions = []
+    for case, metrics in results['cases'].items():
+        old = baseline['cases'].get(case)
+        if old is None:
+            continue
+        if timings and metrics['latency_p50'] > old['latency_p50'] * (1 + time_tolerance):
+            regressions.append(f"{case}: median latency {old['latency_p50']:.3f} s -> {metrics['latency_p50']:.3f} s")
+        if metrics['traced_peak_bytes'] > old['traced_peak_bytes'] * (1 + memory_tolerance):
+            regressions.append(f"{case}: traced peak {old['traced_peak_bytes']} -> {metrics['traced_peak_bytes']} bytes")
+        if metrics['mean_error'] > old['mean_error'] + error_tolerance:
+            regressions.append(f"{case}: mean error {old['mean_error']:.2%} -> {metrics['mean_error']:.2%}")
+    return regressions
+
+
+def check_baseline(results, baseline_file=BASELINE_FILE, **tolerances):
+    """Compare results to the stored baseline, which is created from them if there is none yet.
+
+    Raises RuntimeError listing every regression (see compare_to_baseline). Latencies are only
+    compared when the baseline was recorded on the same machine (see machine_fingerprint);
+    memory and errors do not depend on it.
+    """
+    if not os.path.exists(baseline_file):
+        save_results(results, baseline_file)
+        print(f"No baseline yet, saved this run as {baseline_file}")
+        return
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    timings = machine_fingerprint(baseline['meta']) == machine_fingerprint(results['meta'])
+    if not timings:
+        print(f"Baseline was recorded on {baseline['meta'].get('machine')} with {baseline['meta'].get('cpus')} CPUs, "
+              f"so latencies are not compared; delete it to record one for this machine")
+    regressions = compare_to_baseline(results, baseline, timings=timings, **tolerances)
+    if regressions:
+        raise RuntimeError(f"{len(regressions)} regressions against {baseline_file}:\n" + "\n".join(regressions))
+    print(f"No regressions against {baseline_file}")
+
+
+if __name__ == "__main__":
+    results = run_suite()
+    save_results(results, os.path.join(BENCHMARK_DIR, f"run_{results['meta']['time'].replace(':', '-')}.json"))
+    check_baseline(results)  # delete the baseline file to record a new one
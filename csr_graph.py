@@ -0,0 +1,193 @@
+import numpy as np
+
+
+class CSRGraph:
+    """Immutable undirected graph in compressed sparse row form.
+
+    Nodes are numbered 0..n-1; labels[i] is the original (string) label of node i and
+    label_to_id maps it back. The neighbours of node i are indices[indptr[i]:indptr[i + 1]].
+    Every edge is stored in both directions and self-loops are dropped, since they never lie
+    on a shortest path. A weighted graph also has weights[j], the (positive) length of the
+    edge stored at indices[j]; weights is None for an unweighted graph.
+    """
+
+    __slots__ = ('labels', 'label_to_id', 'indptr', 'indices', 'weights')
+
+    def __init__(self, labels, indptr, indices, weights=None):
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int32)
+        indptr.setflags(write=False)
+        indices.setflags(write=False)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            weights.setflags(write=False)
+        object.__setattr__(self, 'labels', list(labels))
+        object.__setattr__(self, 'label_to_id', {label: i for i, label in enumerate(self.labels)})
+        object.__setattr__(self, 'indptr', indptr)
+        object.__setattr__(self, 'indices', indices)
+        object.__setattr__(self, 'weights', weights)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CSRGraph is immutable")
+
+    @classmethod
+    def from_edges(cls, src, dst, labels, weights=None):
+        """Build the graph from parallel arrays of endpoint ids (each undirected edge once or twice).
+
+        With weights, an edge given more than once keeps its smallest weight.
+        """
+        n = len(labels)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        keep = src != dst  # drop self-loops
+        src, dst = src[keep], dst[keep]
+
+        # Store both directions, then remove duplicates by sorting on (row, column)
+        rows = np.concatenate([src, dst])
+        cols = np.concatenate([dst, src])
+        keys = rows * n + cols
+        if weights is None:
+            keys = np.unique(keys)
+        else:
+            weights = np.asarray(weights, dtype=np.float64)[keep]
+            weights = np.concatenate([weights, weights])
+            order = np.lexsort((weights, keys))  # the lightest copy of every edge comes first
+            keys, weights = keys[order], weights[order]
+            first = np.concatenate(([True], keys[1:] != keys[:-1]))
+            keys, weights = keys[first], weights[first]
+        rows = keys // n
+        cols = keys % n
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(labels, indptr, cols.astype(np.int32), weights)
+
+    @classmethod
+    def from_networkx(cls, G, weight='weight'):
+        """Convert a NetworkX graph; node labels are kept as they appear in G.
+
+        The graph is weighted if every edge has the weight attribute (pass weight=None to
+        ignore weights).
+        """
+        labels = list(G.nodes)
+        label_to_id = {label: i for i, label in enumerate(labels)}
+        num_edges = G.number_of_edges()
+        src = np.fromiter((label_to_id[u] for u, _ in G.edges()), dtype=np.int64, count=num_edges)
+        dst = np.fromiter((label_to_id[v] for _, v in G.edges()), dtype=np.int64, count=num_edges)
+        weights = None
+        if weight is not None and num_edges > 0 and all(weight in data for _, _, data in G.edges(data=True)):
+            weights = np.fromiter((data[weight] for _, _, data in G.edges(data=True)), dtype=np.float64,
+                                  count=num_edges)
+        return cls.from_edges(src, dst, labels, weights)
+
+    def _with_arrays(self, indptr, indices, weights):
+        """A graph with the same nodes but other edges, sharing the label list and lookup."""
+        graph = object.__new__(CSRGraph)
+        for array in (indptr, indices) + (() if weights is None else (weights,)):
+            array.setflags(write=False)
+        for name, value in (('labels', self.labels), ('label_to_id', self.label_to_id), ('indptr', indptr),
+                            ('indices', indices), ('weights', weights)):
+            object.__setattr__(graph, name, value)
+        return graph
+
+    def has_edge(self, u, v):
+        neighbors = self.neighbors(u)
+        i = np.searchsorted(neighbors, v)
+        return i < len(neighbors) and neighbors[i] == v
+
+    def with_edge(self, u, v, weight=None):
+        """A copy of the graph with the edge between node ids u and v added (weight is its length)."""
+        if u == v or self.has_edge(u, v):
+            raise ValueError(f"Cannot add edge ({u}, {v}): it is a self-loop or already present")
+        if self.weighted != (weight is not None):
+            raise ValueError("Pass a weight exactly when the graph is weighted")
+        # Rows are sorted, so inserting at the search position keeps them sorted
+        slots = [self.indptr[u] + np.searchsorted(self.neighbors(u), v),
+                 self.indptr[v] + np.searchsorted(self.neighbors(v), u)]
+        indptr = self.indptr.copy()
+        indptr[u + 1:] += 1
+        indptr[v + 1:] += 1
+        indices = np.insert(self.indices, slots, [v, u])
+        weights = None if weight is None else np.insert(self.weights, slots, weight)
+        return self._with_arrays(indptr, indices, weights)
+
+    def without_edge(self, u, v):
+        """A copy of the graph with the edge between node ids u and v removed."""
+        if not self.has_edge(u, v):
+            raise ValueError(f"Cannot remove edge ({u}, {v}): it is not in the graph")
+        slots = [self.indptr[u] + np.searchsorted(self.neighbors(u), v),
+                 self.indptr[v] + np.searchsorted(self.neighbors(v), u)]
+        indptr = self.indptr.copy()
+        indptr[u + 1:] -= 1
+        indptr[v + 1:] -= 1
+        indices = np.delete(self.indices, slots)
+        weights = None if self.weights is None else np.delete(self.weights, slots)
+        return self._with_arrays(indptr, indices, weights)
+
+    def unweighted(self):
+        """The same graph with its edge weights dropped, so shortest paths count hops."""
+        return self if self.weights is None else self._with_arrays(self.indptr, self.indices, None)
+
+    @property
+    def weighted(self):
+        return self.weights is not None
+
+    def number_of_nodes(self):
+        return len(self.labels)
+
+    def number_of_edges(self):
+        return len(self.indices) // 2
+
+    def degrees(self):
+        """Return the degree of every node as an array indexed by node id."""
+        return np.diff(self.indptr)
+
+    def degree(self, i):
+        return int(self.indptr[i + 1] - self.indptr[i])
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def gather_neighbors(self, nodes):
+        """Return (src, dst) arrays holding every edge leaving the given nodes."""
+        starts = self.indptr[nodes]
+        counts = self.indptr[nodes + 1] - starts
+        src = np.repeat(nodes, counts)
+        # Position of every gathered edge inside indices: start of its row plus its offset in the row
+        offsets = np.arange(len(src)) - np.repeat(np.cumsum(counts) - counts - starts, counts)
+        return src, self.indices[offsets]
+
+    def simplicial(self):
+        """Return a mask of the nodes whose neighbours are all adjacent to each other.
+
+        In an unweighted graph these are exactly the nodes on no shortest path between two other
+        nodes (such a path can skip them), so their BC is 0; nodes of degree 0 or 1 are included.
+        """
+        n = self.number_of_nodes()
+        degrees = self.degrees()
+        src = np.repeat(np.arange(n), degrees)
+        # Each neighbour is adjacent to the node and to its other neighbours, so has at least its degree
+        candidates = np.bincount(src[degrees[self.indices] < degrees[src]], minlength=n) == 0
+        mask = degrees < 2
+        for v in np.flatnonzero(candidates & ~mask):
+            neighbors = self.neighbors(v)
+            mask[v] = all(np.isin(neighbors, self.neighbors(u)).sum() == len(neighbors) - 1 for u in neighbors)
+        return mask
+
+    def zero_betweenness(self):
+        """Return a mask of the nodes whose BC is 0 for sure: simplicial(), or of degree 0 or 1 with weights."""
+        return self.simplicial() if not self.weighted else self.degrees() < 2
+
+    def components(self):
+        """Return the connected component of every node, as the smallest node id in it."""
+        component = np.full(self.number_of_nodes(), -1, dtype=np.int64)
+        for root in range(self.number_of_nodes()):
+            if component[root] >= 0:
+                continue
+            component[root] = root
+            frontier = np.array([root])
+            while len(frontier) > 0:  # level by level BFS
+                _, dst = self.gather_neighbors(frontier)
+                frontier = np.unique(dst[component[dst] < 0])
+                component[frontier] = root
+        return component
@@ -0,0 +1,150 @@
+from collections import defaultdict
+
+import numpy as np
+
+from shortest_paths import accumulate_dependencies, shortest_path_dag
+
+
+class DynamicBetweenness:
+    """Betweenness of a CSRGraph kept up to date under edge insertions and deletions.
+
+    For every tracked source s the distances, path counts and dependencies delta_s are kept as
+    rows of three (sources x n) arrays, and total is their sum over the sources. An edge update
+    only touches the sources for which it changes something: an inserted edge (u, v) matters
+    to s only if u and v are at different distances from s, and a deleted one only if it was a
+    shortest-path edge. For those sources the change is repaired level by level, starting
+    from the lower endpoint; only the nodes whose distance or path count changes and the nodes
+    above them whose dependency changes are visited. A deletion that leaves the lower
+    endpoint without any shortest path at its old distance redoes the source's BFS.
+
+    On a weighted graph dist holds path lengths (-1 if unreachable) and the same tests pick
+    the sources an update matters to: an inserted edge of weight w if it is at least as short
+    as the way around it, a deleted one if it was on a shortest path. Their Dijkstra search
+    is redone, since a weighted repair would have to reorder every node below the edge.
+
+    With every node as a source the values are exact; with a uniform sample of sources they
+    are unbiased estimates, scaled the same way. Memory is 20 bytes per (source, node).
+    """
+
+    def __init__(self, graph, sources):
+        self.graph = graph
+        self.sources = np.asarray(sources, dtype=np.int64)
+        n = graph.number_of_nodes()
+        self.dist = np.empty((len(self.sources), n), dtype=np.float64 if graph.weighted else np.int32)
+        self.sigma = np.empty((len(self.sources), n))
+        self.delta = np.empty((len(self.sources), n))
+        for i in range(len(self.sources)):
+            self._recompute(i)
+        self.total = self.delta.sum(axis=0)
+        self.repaired = 0  # sources repaired in place
+        self.recomputed = 0  # sources whose BFS (or Dijkstra search) was redone
+
+    def betweenness(self):
+        """BC of every node id, normalized like exact_betweenness (exact when every node is a source)."""
+        n = self.graph.number_of_nodes()
+        if n <= 2:
+            return np.zeros(n)
+        return self.total * n / (len(self.sources) * (n - 1) * (n - 2))
+
+    def add_edge(self, u, v, weight=None):
+        """Insert the edge between node ids u and v and update the dependencies (weight: its length, if weighted)."""
+        self.graph = self.graph.with_edge(u, v, weight)
+        if self.graph.weighted:
+            du, dv = self.dist[:, u], self.dist[:, v]
+            # Unreachable counts as infinitely far, but an edge between two unreachable nodes changes nothing
+            du, dv = np.where(du < 0, np.inf, du), np.where(dv < 0, np.inf, dv)
+            affected = (np.minimum(du, dv) < np.inf) & ((du + weight <= dv) | (dv + weight <= du))
+            for i in np.flatnonzero(affected).tolist():
+                self._redo(i)
+            return
+        # Unreachable counts as infinitely far; an edge between equally far nodes is on no shortest path
+        du = np.where(self.dist[:, u] < 0, np.iinfo(np.int32).max, self.dist[:, u])
+        dv = np.where(self.dist[:, v] < 0, np.iinfo(np.int32).max, self.dist[:, v])
+        for i in np.flatnonzero(du != dv).tolist():
+            near, far = (u, v) if du[i] < dv[i] else (v, u)
+            self._repair(i, near, far)
+
+    def remove_edge(self, u, v):
+        """Delete the edge between node ids u and v and update the dependencies."""
+        graph = self.graph
+        self.graph = graph.without_edge(u, v)
+        du, dv = self.dist[:, u], self.dist[:, v]
+        if graph.weighted:
+            weight = graph.weights[graph.indptr[u] + np.searchsorted(graph.neighbors(u), v)]
+            for i in np.flatnonzero((du >= 0) & ((du + weight == dv) | (dv + weight == du))).tolist():
+                self._redo(i)
+            return
+        for i in np.flatnonzero((du >= 0) & (np.abs(du - dv) == 1)).tolist():
+            near, far = (u, v) if du[i] < dv[i] else (v, u)
+            neighbors = self.graph.neighbors(far)
+            if (self.dist[i, neighbors] == self.dist[i, near]).any():
+                self._repair(i, near, far)  # far keeps its distance through another neighbour
+            else:
+                self._redo(i)
+
+    def _recompute(self, i):
+        dag = shortest_path_dag(self.graph, int(self.sources[i]))
+        dist = dag.dist if dag.lengths is None else np.where(dag.dist >= 0, dag.lengths[dag.dist], -1)
+        self.dist[i], self.sigma[i], self.delta[i] = dist, dag.sigma, accumulate_dependencies(dag)
+
+    def _redo(self, i):
+        """Recompute source i from scratch and update the totals."""
+        old = self.delta[i].copy()
+        self._recompute(i)
+        self.total += self.delta[i] - old
+        self.recomputed += 1
+
+    def _repair(self, i, near, far):
+        """Repair source i after the edge (near, far) changed, with far at one level below near.
+
+        Only valid when no distance grows: after any insertion, and after a deletion that
+        leaves far at its old distance.
+        """
+        graph = self.graph
+        dist, sigma, delta = self.dist[i], self.sigma[i], self.delta[i]
+        old_dist, old_sigma = dist.copy(), sigma.copy()
+
+        # Distances and path counts, level by level below near. A node is revisited when a
+        # neighbour one level up changed; its distance can only shrink to that level + 1.
+        level = dist[near] + 1
+        frontier = np.array([far])
+        changed_levels = []
+        while len(frontier) > 0:
+            dist[frontier] = level
+            src, dst = graph.gather_neighbors(frontier)
+            up = dist[dst] == level - 1
+            position = np.searchsorted(frontier, src[up])
+            sigma[frontier] = np.bincount(position, weights=sigma[dst[up]], minlength=len(frontier))
+            frontier = frontier[(old_dist[frontier] != level) | (old_sigma[frontier] != sigma[frontier])]
+            changed_levels.append(frontier)
+            src, dst = graph.gather_neighbors(frontier)
+            frontier = np.unique(dst[(dist[dst] < 0) | (dist[dst] > level)])
+            level += 1
+        changed = np.concatenate(changed_levels)
+
+        # Dependencies, deepest level first. Every changed node is recomputed, and so is every
+        # node whose children changed: its parents before the update (near for a deleted edge)
+        # and after it, which are scheduled as the levels are swept.
+        src, dst = graph.gather_neighbors(changed)
+        old_parents = dst[(old_dist[src] > 0) & (old_dist[dst] == old_dist[src] - 1)]
+        dirty = np.concatenate([changed, old_parents, [near]])
+        pending = defaultdict(list)
+        for level in np.unique(dist[dirty]).tolist():
+            pending[level].append(dirty[dist[dirty] == level])
+        while pending:
+            level = max(pending)
+            nodes = np.unique(np.concatenate(pending.pop(level)))
+            if level <= 0:
+                continue  # the source's own entry stays 0
+            src, dst = graph.gather_neighbors(nodes)
+            down = dist[dst] == level + 1
+            position = np.searchsorted(nodes, src[down])
+            new = np.bincount(position, weights=sigma[src[down]] / sigma[dst[down]] * (1 + delta[dst[down]]),
+                              minlength=len(nodes))
+            moved = (new != delta[nodes]) | (old_dist[nodes] != dist[nodes]) | (old_sigma[nodes] != sigma[nodes])
+            self.total[nodes] += new - delta[nodes]
+            delta[nodes] = new
+            up = (dist[dst] == level - 1) & moved[np.searchsorted(nodes, src)]
+            if up.any():
+                pending[level - 1].append(dst[up])
+        self.repaired += 1
@@ -0,0 +1,111 @@
+import contextlib
+import os
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from graph_cache import load_graph
+from parallel_sampling import SamplingPool
+from shortest_paths import sum_dependencies
+from true_bc import WEIGHTED_SUFFIX
+
+
+def load_checkpoint(checkpoint, n, block_size):
+    """Return (total, done) from a checkpoint file, or fresh ones if it is missing or stale."""
+    num_blocks = -(-n // block_size)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with np.load(checkpoint) as data:
+            if int(data['n']) == n and int(data['block_size']) == block_size:
+                return data['total'].copy(), data['done'].copy()
+        print(f"Ignoring checkpoint {checkpoint}: it was made for a different graph or block size")
+    return np.zeros(n), np.zeros(num_blocks, dtype=bool)
+
+
+def save_checkpoint(checkpoint, total, done, block_size):
+    tmp = checkpoint + '.tmp.npz'
+    np.savez(tmp, n=len(total), block_size=block_size, total=total, done=done)
+    os.replace(tmp, checkpoint)  # never leave a half written checkpoint behind
+
+
+def exact_betweenness(graph, workers=1, checkpoint=None, block_size=1000):
+    """Exact (Brandes) betweenness centrality of every node of a CSRGraph.
+
+    Every node is used as a source once; the sources are split into blocks of block_size
+    whose dependency sums are computed by a pool of workers. After each finished block the
+    partial sums are written to checkpoint (if given), and a later call with the same
+    checkpoint only computes the blocks that are still missing. The sources of a block are
+    searched 64 at a time with a multi-source BFS; weighted graphs use Dijkstra's algorithm,
+    so the edge weights count as lengths. The result is normalized
+    like nx.betweenness_centrality, i.e. divided by (n-1)(n-2).
+    """
+    n = graph.number_of_nodes()
+    total, done = load_checkpoint(checkpoint, n, block_size)
+    todo = np.flatnonzero(~done).tolist()
+    if len(todo) < len(done):
+        print(f"Resuming from {checkpoint}: {len(done) - len(todo)} of {len(done)} blocks done")
+
+    def finish(block, block_sum):
+        total[:] += block_sum
+        done[block] = True
+        if checkpoint is not None:
+            save_checkpoint(checkpoint, total, done, block_size)
+
+    blocks = {block: np.arange(block * block_size, min((block + 1) * block_size, n)) for block in todo}
+    if workers > 1:
+        with SamplingPool(graph, workers) as pool:
+            futures = {pool.sum_dependencies(sources): block for block, sources in blocks.items()}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+    else:
+        for block, sources in blocks.items():
+            finish(block, sum_dependencies(graph, sources))
+
+    return total / ((n - 1) * (n - 2)) if n > 2 else total
+
+
+def save_true_betweenness(graph, betweenness, file_path):
+    """Write betweenness values in the Node/BetweennessCentrality format read by load_true_betweenness."""
+    tmp = file_path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write("Node\tBetweennessCentrality\n")  # Write header
+        f.writelines(f"{node}\t{centrality}\n" for node, centrality in zip(graph.labels, betweenness.tolist()))
+    os.replace(tmp, file_path)
+
+
+def calculate_and_save_betweenness(input_file, graph_name, output_folder='BetweennessCentrality', workers=1,
+                                   block_size=1000, weighted=False):
+    """Compute the exact betweenness of a graph file and save it as the graph's ground truth.
+
+    The run checkpoints next to the output file and resumes from there if it was interrupted;
+    the checkpoint is removed once the result has been written. By default the result counts
+    hops and edge weights are ignored; with weighted they are lengths, and the file is saved
+    under graph_name plus WEIGHTED_SUFFIX, where true_bc_path(graph_name, weighted=True) finds it.
+    """
+    if weighted:
+        graph_name += WEIGHTED_SUFFIX
+    os.makedirs(output_folder, exist_ok=True)
+    file_path = os.path.join(output_folder, f'betweenness_centrality_{graph_name}.txt')
+    checkpoint = os.path.join(output_folder, f'betweenness_centrality_{graph_name}.checkpoint.npz')
+
+    graph = load_graph(input_file, weighted=weighted)
+    start_time = time.time()
+    betweenness = exact_betweenness(graph, workers, checkpoint, block_size)
+    save_true_betweenness(graph, betweenness, file_path)
+    with contextlib.suppress(FileNotFoundError):  # no block ran, e.g. for an empty graph
+        os.remove(checkpoint)
+    print(f"Betweenness centrality saved to {file_path} ({time.time() - start_time:.1f} seconds)")
+
+
+if __name__ == "__main__":
+    # Ground truth for the edge-list graphs, using every core
+    graphs = {
+        'Musea': 'NewGraphs/musae_facebook_edges.csv',
+        'Wiki': 'NewGraphs/wiki-Vote.txt.gz',
+    }
+    for graph_name, input_file in graphs.items():
+        calculate_and_save_betweenness(input_file, graph_name, workers=os.cpu_count())
+    # Weighted ground truth for the graphs with edge weights
+    for graph_name in ('Cite', 'Road'):
+        calculate_and_save_betweenness(f'GraphsNetworkX/{graph_name}.graphml', graph_name, workers=os.cpu_count(),
+                                       weighted=True)
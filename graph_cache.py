@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from csr_graph import CSRGraph
+from ingest import load_csr
+
+CACHE_DIR = 'GraphCache'  # Folder holding the converted graphs
+CACHE_VERSION = 4  # bumped when the stored layout or the parsing changes (2: weights, 3: .mtx size lines, 4: indents)
+
+
+def file_digest(file_path):
+    """SHA-256 of a file's contents, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_graph(file_path):
+    """Parse a graph file into a CSRGraph, choosing the reader by extension."""
+    if file_path.endswith('.graphml'):
+        import networkx as nx
+        return CSRGraph.from_networkx(nx.read_graphml(file_path))
+    return load_csr(file_path)  # streamed Matrix Market, DIMACS or edge list
+
+
+def temp_entry(entry):
+    """A new, empty folder next to entry, private to this process, to write the entry into."""
+    return tempfile.mkdtemp(prefix=os.path.basename(entry) + '.tmp', dir=os.path.dirname(entry))
+
+
+def publish_entry(tmp, entry):
+    """Rename the complete folder tmp to entry, so only complete entries appear under their final name.
+
+    Processes loading the same file at the same time each write their own copy; if another
+    one got there first, its entry is kept and ours is dropped.
+    """
+    try:
+        os.replace(tmp, entry)
+    except OSError:
+        if not os.path.isdir(entry):
+            raise
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def save_graph(graph, entry):
+    """Write the CSR arrays and the label table as .npy files in the folder entry."""
+    tmp = temp_entry(entry)
+    np.save(os.path.join(tmp, 'indptr.npy'), graph.indptr)
+    np.save(os.path.join(tmp, 'indices.npy'), graph.indices)
+    np.save(os.path.join(tmp, 'labels.npy'), np.array(graph.labels, dtype=str))
+    if graph.weighted:
+        np.save(os.path.join(tmp, 'weights.npy'), graph.weights)
+    publish_entry(tmp, entry)
+
+
+def open_graph(entry):
+    """Open a cached graph; the CSR arrays are memory-mapped instead of read."""
+    indptr = np.load(os.path.join(entry, 'indptr.npy'), mmap_mode='r')
+    indices = np.load(os.path.join(entry, 'indices.npy'), mmap_mode='r')
+    labels = np.load(os.path.join(entry, 'labels.npy'), mmap_mode='r').tolist()
+    weights_path = os.path.join(entry, 'weights.npy')
+    weights = np.load(weights_path, mmap_mode='r') if os.path.exists(weights_path) else None
+    return CSRGraph(labels, indptr, indices, weights)
+
+
+def cache_entry(file_path, cache_dir=CACHE_DIR):
+    """Path of the cache folder for the current contents of file_path (it may not exist yet).
+
+    The entry is named after the file and the hash of its contents. The hash is only recomputed
+    when the file's size or modification time changed; entries of older versions are removed
+    then. Files are told apart by their resolved path, so files with the same name in different
+    folders get entries of their own.
+    """
+    stat = os.stat(file_path)
+    path_digest = hashlib.sha256(os.path.realpath(file_path).encode()).hexdigest()
+    name = f"{os.path.basename(file_path)}.{path_digest[:12]}"
+    os.makedirs(cache_dir, exist_ok=True)
+
+    meta_path = os.path.join(cache_dir, name + '.json')
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    if meta.get('size') == stat.st_size and meta.get('mtime_ns') == stat.st_mtime_ns:
+        digest = meta['sha256']
+    else:
+        digest = file_digest(file_path)
+        fd, tmp = tempfile.mkstemp(prefix=name + '.json.tmp', dir=cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'source': file_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}, f)
+        os.replace(tmp, meta_path)  # readers never see a half-written file
+
+    entry = os.path.join(cache_dir, f"{name}.v{CACHE_VERSION}.{digest[:16]}")
+    if not os.path.isdir(entry):
+        # Drop entries of older versions of the same file before a new one is stored; the new
+        # entry and folders still being written (.tmp) may belong to another process
+        for old in os.listdir(cache_dir):
+            if old.startswith(name + '.v') and '.tmp' not in old[len(name):] and old != os.path.basename(entry):
+                shutil.rmtree(os.path.join(cache_dir, old), ignore_errors=True)
+    return entry
+
+
+def load_graph(file_path, cache_dir=CACHE_DIR, weighted=True):
+    """Load a GraphML, Matrix Market, DIMACS or edge-list graph through the binary cache.
+
+    The first load parses the file and stores the result under the hash of the file's
+    contents; later loads memory-map that copy, and a changed file gets a fresh cache entry.
+    With weighted=False any edge weights are dropped and shortest paths count hops.
+    """
+    entry = cache_entry(file_path, cache_dir)
+    if os.path.isdir(entry):
+        graph = open_graph(entry)
+    else:
+        graph = parse_graph(file_path)
+        save_graph(graph, entry)
+        print(f"Cached {file_path} in {entry}")
+    return graph if weighted else graph.unweighted()
@@ -0,0 +1,93 @@
+import gzip
+
+import numpy as np
+
+from csr_graph import CSRGraph
+
+CHUNK_BYTES = 1 << 24  # roughly how much text is parsed at a time
+
+
+def detect_format(file_path):
+    """Guess the format of a graph file from its extension."""
+    name = file_path[:-3] if file_path.endswith('.gz') else file_path
+    if name.endswith('.mtx'):
+        return 'mtx'
+    if name.endswith('.gr'):
+        return 'dimacs'
+    if name.endswith('.csv'):
+        return 'csv'
+    return 'edgelist'  # whitespace separated SNAP style (.txt, .edges, ...)
+
+
+def _parse_chunk(lines, fmt):
+    """Parse one chunk of lines into an (edges x columns) float array.
+
+    Lines may be indented; np.loadtxt splits on any whitespace, as the original reader did.
+    """
+    lines = [line.lstrip() for line in lines]
+    if fmt == 'dimacs':
+        lines = [line[1:] for line in lines if line.startswith('a')]  # arc lines: a u v weight
+    else:
+        lines = [line for line in lines if line[:1].isdigit()]  # skips comments and CSV headers
+    if not lines:
+        return np.zeros((0, 2))
+    return np.loadtxt(lines, delimiter=',' if fmt == 'csv' else None, ndmin=2)
+
+
+def _skip_mtx_header(f):
+    """Read past the banner, comments and size line of a Matrix Market file.
+
+    Returns the lines read that already hold edges: a file without the %%MatrixMarket banner
+    has no size line either, so its first line is data.
+    """
+    line = f.readline()
+    if not line.lstrip().startswith('%%MatrixMarket'):
+        return [line]
+    for line in f:
+        if line.strip() and not line.lstrip().startswith('%'):
+            break  # the size line: rows, columns and number of entries
+    return []
+
+
+def read_edges(file_path, fmt=None, chunk_bytes=CHUNK_BYTES):
+    """Stream the edges of a Matrix Market, DIMACS .gr, CSV or SNAP edge-list file.
+
+    Yields (src, dst, weight) array triples, one per chunk of about chunk_bytes of text, so
+    memory use does not grow with the file size; weight is None when the file has no third
+    column. Gzipped files are decompressed on the fly.
+    """
+    fmt = fmt or detect_format(file_path)
+    opener = gzip.open if file_path.endswith('.gz') else open
+    with opener(file_path, 'rt') as f:
+        lines = _skip_mtx_header(f) if fmt == 'mtx' else []  # the size line is not an edge
+        while True:
+            lines += f.readlines(chunk_bytes)
+            if not lines:
+                break
+            data = _parse_chunk(lines, fmt)
+            lines = []
+            if len(data) == 0:
+                continue
+            weight = data[:, 2] if data.shape[1] > 2 else None
+            yield data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), weight
+
+
+def load_csr(file_path, fmt=None, chunk_bytes=CHUNK_BYTES):
+    """Build a CSRGraph straight from an edge file, without going through NetworkX.
+
+    Node labels are the file's integer ids as strings, matching what read_graphml gives. The
+    graph is weighted if the file has a weight column (DIMACS arcs, weighted Matrix Market).
+    """
+    src_chunks, dst_chunks, weight_chunks = [], [], []
+    for src, dst, weight in read_edges(file_path, fmt, chunk_bytes):
+        src_chunks.append(src)
+        dst_chunks.append(dst)
+        weight_chunks.append(weight)
+    src = np.concatenate(src_chunks) if src_chunks else np.zeros(0, dtype=np.int64)
+    dst = np.concatenate(dst_chunks) if dst_chunks else np.zeros(0, dtype=np.int64)
+    weighted = bool(weight_chunks) and all(weight is not None for weight in weight_chunks)
+    weights = np.concatenate(weight_chunks) if weighted else None
+
+    # Renumber the (possibly sparse) file ids to 0..n-1
+    ids, endpoints = np.unique(np.concatenate([src, dst]), return_inverse=True)
+    return CSRGraph.from_edges(endpoints[:len(src)], endpoints[len(src):], [str(i) for i in ids.tolist()], weights)
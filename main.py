@@ -1,121 +1,132 @@
-import networkx as nx
+import numpy as np
 import os
-import random
 import time
 
+from csr_graph import CSRGraph
+from graph_cache import load_graph
+from parallel_sampling import dependency_batches, resolve_seed, run_adaptive, sampling_pool
+from path_cache import PathCache
+from results_store import COMPRESSION_SUFFIXES, write_result_file
+from shortest_paths import accumulate_dependencies, shortest_path_dag
+from true_bc import WEIGHTED_SUFFIX, load_true_betweenness, true_bc_path
+
 class GraphCentralityCalculator:
-    def __init__(self, graph, graph_name):
-        self.G = graph
+    def __init__(self, graph, graph_name, cache_bytes=256 * 2**20, cache_policy='lru'):
+        # All traversals run on a compact CSR copy of the graph
+        self.graph = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
         self.graph_name = graph_name  # Save the graph name
-        self.node_list = list(self.G.nodes)
-        self.shortest_paths = {node: {other_node: [] for other_node in self.node_list} for node in self.node_list}
+        self.node_list = self.graph.labels
+        self.node_index = self.graph.label_to_id  # node label -> integer id
+        self.shortest_paths = PathCache(cache_bytes, cache_policy)  # shortest-path DAGs of recently sampled sources
         self.betweenness = {node: 0 for node in self.node_list} # betweenness centrality values for all nodes
         self.betweennessAlt = {node: 0 for node in self.node_list} # for alternative way to calculate betweennesscentrality
-        self.degrees = {node: self.G.degree(node) for node in self.node_list}  # Calculate degrees of nodes
-        self.dependencies = {}  # Store dependencies for memoization
+        self.degrees = dict(zip(self.node_list, self.graph.degrees().tolist()))  # Calculate degrees of nodes
+
+    def save_results_to_file(self, true_bc, approx_bc, num_SSP_dict, output_folder, file_name, calculation_time,
+                             nodes=None, compression=None):
+        """Save all results to a single file in the specified format.
 
-    def save_results_to_file(self, true_bc, approx_bc, num_SSP_dict, output_folder, file_name, calculation_time):
+        nodes limits the file to those nodes (all nodes with a true BC by default), e.g. the
+        ones that were estimated. compression is None, 'gzip' or 'zstd'.
+        """
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
 
-        total_nodes = len(self.G.nodes)
+        if nodes is None:
+            nodes = list(true_bc)
+        file_path = os.path.join(output_folder, f"{self.graph_name}_{file_name}{COMPRESSION_SUFFIXES[compression]}")
+        write_result_file(file_path, nodes,
+                          [self.degrees.get(node, 0) for node in nodes],
+                          [true_bc[node] for node in nodes],
+                          [approx_bc.get(node, 0) for node in nodes],
+                          [num_SSP_dict.get(node, 0) for node in nodes],
+                          self.graph.number_of_nodes(), calculation_time)
 
-        file_path = os.path.join(output_folder, f"{self.graph_name}_{file_name}")
-        with open(file_path, 'w') as f:
-            # Write the header
-            f.write(f"Total Nodes: {total_nodes}\n")
-            f.write(f"Calculation Time (seconds): {calculation_time}\n\n")
-            f.write("Node\tDegree\tTrue_BC\tApproximated_BC\tErrorPercentage\tNumSSP\tNumSSP/TotalNodes\n")
+        print(f"Results saved to {file_path}")
 
-            # Write the data for each node
-            for node in true_bc:
-                degree = self.degrees.get(node, 0)  # Get the degree of the node
-                true_bc_value = true_bc[node]
-                approx_bc_value = approx_bc.get(node, 0)  # Get the approximated BC value
-                error_percentage = (abs(true_bc_value - approx_bc_value) / true_bc_value) * 100 if true_bc_value > 0 else 0
-                num_SSP = num_SSP_dict.get(node, 0)  # Get the number of SSP calculations for the node
-                num_SSP_per_node = num_SSP / total_nodes if total_nodes > 0 else 0
+    def shortest_path_calculation(self, s):
+        """Return the shortest-path DAG from s (BFS, or Dijkstra on weighted graphs) unless s is cached."""
+        dag = self.shortest_paths.get(s)
+        if dag is None:  # Only calculate if s isn't in the cache
+            dag = shortest_path_dag(self.graph, self.node_index[s])
+            self.shortest_paths.put(s, dag)
+        return dag
+
+    def dependency_vector(self, s):
+        """Return the dependency of source s on every node id, accumulated Brandes-style."""
+        return accumulate_dependencies(self.shortest_path_calculation(s))
+
+    def sample_stream(self, target_ids, seed, key, pool=None):
+        """Dependencies of a seeded stream of sampled sources on the target ids, batch by batch.
+
+        Without a pool the samples are computed here, going through the path cache.
+        """
+        if pool is not None:
+            return pool.batches(target_ids, seed, key)
+        return dependency_batches(self.graph, target_ids, seed, key,
+                                  dependency=lambda s: self.dependency_vector(self.node_list[s]))
+
+    def approximate_BC_shared(self, c, pool=None, seed=None, nodes=None):
+        """Estimate every node (or the given nodes) from one shared stream of sampled sources.
+
+        Every sample's dependency vector is added to the running sum of each node that is still
+        below its c * n threshold; a node stops, with its own k, as soon as it crosses it.
+        """
+        n = self.graph.number_of_nodes()
+        seed = resolve_seed(seed)
+        start_time = time.time()  # Track the start time of the calculations
+
+        S = np.zeros(n)  # running sum per node
+        k = np.zeros(n, dtype=np.int64)  # number of samples per node
+        estimated = np.ones(n, dtype=bool) if nodes is None else np.isin(np.arange(n), self.node_ids(nodes))
+        targets = np.flatnonzero(estimated & ~self.graph.zero_betweenness())  # the others have BC 0 for sure
+        S[targets], k[targets] = run_adaptive(self.sample_stream(targets, seed, 0, pool), len(targets), c * n, n)
+
+        sampled = k > 0
+        betweenness = np.zeros(n)
+        betweennessAlt = np.zeros(n)
+        betweenness[sampled] = S[sampled] / (k[sampled] * (n - 1) * (n - 2))
+        betweennessAlt[sampled] = (n * S[sampled]) / k[sampled]
+        self.betweenness = dict(zip(self.node_list, betweenness.tolist()))
+        self.betweennessAlt = dict(zip(self.node_list, betweennessAlt.tolist()))
+        num_SSP_dict = dict(zip(self.node_list, k.tolist()))
+
+        calculation_time = time.time() - start_time
+        return self.betweenness, self.betweennessAlt, num_SSP_dict, calculation_time
 
-                f.write(f"{node}\t{degree}\t{true_bc_value}\t{approx_bc_value}\t{error_percentage:.6f}\t{num_SSP}\t{num_SSP_per_node:.6f}\n")
+    def approximate_BC(self, c, shared=False, workers=1, seed=None, nodes=None):
+        """Adaptive-sampling BC estimates for every node, or only for the given nodes.
 
-        print(f"Results saved to {file_path}")
+        With workers > 1 the sampled sources are computed by a process pool. The samples come
+        from per-batch streams derived from seed, so a given seed gives the same results for
+        any number of workers. Nodes that are not estimated are left at 0.
+        """
+        with sampling_pool(self.graph, workers) as pool:
+            if shared:
+                return self.approximate_BC_shared(c, pool, seed, nodes)
+            return self.approximate_BC_per_node(c, pool, seed, nodes)
 
-    def shortest_path_calculation(self, s):
-        for node in self.node_list:
-            if len(self.shortest_paths[s][node]) == 0:  # Only calculate if the shortest path is empty
-                if nx.has_path(self.G, node, s):  # Check if a path exists
-                    new_path = nx.shortest_path(self.G, source=node, target=s)  # Get the shortest path from node to s
-                    self.shortest_paths[s][node] = new_path
-
-                    # Propagate the reverse shortest path as well (i.e., from node to s)
-                    self.shortest_paths[node][s] = new_path[::-1]  # Reverse the path from s to node
-
-                    # Automatically propagate shortest paths to other nodes
-                    for i in range(len(new_path) - 1):
-                        u = new_path[i]
-                        v = new_path[i + 1]
-                        if len(self.shortest_paths[u][v]) == 0:  # If we haven't already added the path
-                            self.shortest_paths[u][v] = [u, v]
-                            self.shortest_paths[v][u] = [v, u]  # Also store the reverse path
-                else:
-                    # No path exists between node and s, mark it as empty
-                    self.shortest_paths[s][node] = []
-                    self.shortest_paths[node][s] = []
-
-    def calculate_dependency(self, s, t, v, predecessors):
-        # Base case: if s == t, dependency is zero
-        if s == t:
-            return 0
-        
-        # Memoize the dependency for the pair (s, t)
-        if (s, t, v) in self.dependencies:
-            return self.dependencies[(s, t, v)]
-
-        # Initialize the dependency for the pair (s, t)
-        dependency = 0
-
-        # Iterate over the predecessors of t
-        for w in predecessors[t]:
-            # Recursively calculate the dependency for (s, w)
-            dep_w = self.calculate_dependency(s, w, v, predecessors)
-            # Add to the dependency of (s, t) for vertex v
-            dependency += (1 + dep_w)
-        # Memoize the result
-        self.dependencies[(s, t, v)] = dependency
-        return dependency
-
-    def approximate_BC(self, c):
-        n = self.G.number_of_nodes()
+    def node_ids(self, nodes):
+        """The integer ids of node labels, as an array."""
+        return np.array([self.node_index[v] for v in nodes], dtype=np.int64)
+
+    def approximate_BC_per_node(self, c, pool=None, seed=None, nodes=None):
+        n = self.graph.number_of_nodes()
         num_SSP_dict = {node: 0 for node in self.node_list}  # Track num_SSP for each node
+        seed = resolve_seed(seed)
+        start_time = time.time()  # Track the start time of the calculations, over all nodes
 
-        for v in self.node_list:
-            Degree = self.G.degree(v)
-            if Degree == 0 or Degree == 1:  # if the degree of v is 0 or 1 then the BC is automatically 0
+        zero = self.graph.zero_betweenness()
+        for v in self.node_list if nodes is None else nodes:
+            v_id = self.node_index[v]
+            if zero[v_id]:
                 self.betweenness[v] = 0
                 self.betweennessAlt[v] = 0
             else:
-                S = 0  # Counter for the running sum
-                k = 0  # Counter for the number of samples
-
-                start_time = time.time()  # Track the start time of the calculations
-
-                while S < c * n:
-                    s = random.choice(list(self.G.nodes))  # sample a random node
-                    k += 1  # Increment the number of samples
-                    self.shortest_path_calculation(s)  # calculate all shortest paths from s to all other nodes
-                    num_SSP_dict[v] += 1  # increase number of SSP calcs done for this specific node
-                    predecessors = {node: set() for node in self.node_list}  # add all predecessors from the paths from s
-                    for target, path in self.shortest_paths[s].items():
-                        for i in range(1, len(path)):  # Skip the source vertex
-                            predecessors[path[i]].add(path[i-1])  # Add the predecessor to the set
-                    total_dependency = 0
-                    for target, path in self.shortest_paths[s].items():
-                        if target == s:  # Skip the source vertex
-                            continue
-                        if v in path:
-                            total_dependency += self.calculate_dependency(s, target, v, predecessors)
-      
-                    S += total_dependency
+                # Sample until S >= c * n (or n samples), each node with its own stream of sources
+                S, k = run_adaptive(self.sample_stream(np.array([v_id]), seed, v_id + 1, pool), 1, c * n, n)
+                S, k = float(S[0]), int(k[0])
+                num_SSP_dict[v] = k  # number of SSP calcs done for this specific node
                 self.betweenness[v] = S / (k * (n - 1) * (n - 2))
                 self.betweennessAlt[v] = (n*S)/k
         end_time = time.time()  # Track the end time of the calculations
@@ -124,31 +135,24 @@ class GraphCentralityCalculator:
         return self.betweenness, self.betweennessAlt, num_SSP_dict, calculation_time
 
 
-def load_true_betweenness(file_path):
-    true_bc = {}
-    with open(file_path, 'r') as f:
-        next(f)  # Skip header
-        for line in f:
-            node, bc_value = line.strip().split('\t')
-            true_bc[node] = float(bc_value)
-    return true_bc
-
-
-def process_graph(input_file, output_folder, c_values):
-    # Load the graph from the specified file
-    G = nx.read_graphml(input_file)
+def process_graph(input_file, output_folder, c_values, shared=False, workers=1, seed=None, weighted=False):
+    # Load the graph from the specified file; hop counts unless weighted, then the edge weights are lengths
+    G = load_graph(input_file, weighted=weighted)  # memory-mapped from the binary cache
     graph_name = os.path.basename(input_file).split('.')[0]  # Extract graph name from the file name
     print(f"Processing graph: {graph_name}")
     
-    calculator = GraphCentralityCalculator(G, graph_name)
+    # Weighted results are saved under their own name, next to the hop-count ones
+    calculator = GraphCentralityCalculator(G, graph_name + WEIGHTED_SUFFIX if weighted else graph_name)
 
-    # Load true betweenness centrality values from the corresponding file
-    true_bc_file_path = os.path.join('BetweennessCentrality', f'betweenness_centrality_{graph_name}.txt')
-    true_bc = load_true_betweenness(true_bc_file_path)
+    # Load true betweenness centrality values from the corresponding file (the weighted one if G has weights)
+    true_bc = load_true_betweenness(true_bc_path(graph_name, G.weighted))  # memory-mapped after the first load
 
     for c in c_values:
         print(f"Calculating Betweenness Centrality for c={c}...")
-        betweenness, betweennessAlt, num_SSP_dict, calculation_time = calculator.approximate_BC(c)
+        betweenness, betweennessAlt, num_SSP_dict, calculation_time = calculator.approximate_BC(
+            c, shared, workers, None if seed is None else (seed, c))
+        cache = calculator.shortest_paths.stats()
+        print(f"Path cache: {cache['hits']} hits, {cache['misses']} misses, {cache['entries']} sources kept")
 
         # Create output folder for the specific value of c
         c_output_folder = os.path.join(output_folder, f"Results_{c}")
@@ -164,22 +168,23 @@ def process_graph(input_file, output_folder, c_values):
         calculator.save_results_to_file(true_bc, betweennessAlt, num_SSP_dict, c_alt_output_folder, f"results_c{c}.txt", calculation_time)
 
 
-def process_all_graphs(input_folder, output_folder, c_values):
+def process_all_graphs(input_folder, output_folder, c_values, shared=False, workers=1, seed=None, weighted=False):
     for file_name in os.listdir(input_folder):
         if file_name.endswith('.graphml'):  
             file_path = os.path.join(input_folder, file_name)
-            process_graph(file_path, output_folder, c_values)
+            process_graph(file_path, output_folder, c_values, shared, workers, seed, weighted)
 
-# Input and output folders, and c values to process
-input_folder = 'GraphsNetworkX'  # Folder containing the graph files
-output_folder = 'Results'  # Parent folder to save the results
-c_values = [2, 3, 4, 5]  # Values of c to iterate over
+if __name__ == "__main__":
+    # Input and output folders, and c values to process
+    input_folder = 'GraphsNetworkX'  # Folder containing the graph files
+    output_folder = 'Results'  # Parent folder to save the results
+    c_values = [2, 3, 4, 5]  # Values of c to iterate over
 
-# Uncomment the next line to process all graphs in the folder
-process_all_graphs(input_folder, output_folder, c_values)
+    # Uncomment the next line to process all graphs in the folder
+    process_all_graphs(input_folder, output_folder, c_values)
 
 
-#single_graph = "GraphsNetworkX/Test1.graphml"  # Specify the graph file you want to process
-#c_values = [1]  # Values of c to iterate over
-#process_graph(single_graph, output_folder, c_values)
+    #single_graph = "GraphsNetworkX/Test1.graphml"  # Specify the graph file you want to process
+    #c_values = [1]  # Values of c to iterate over
+    #process_graph(single_graph, output_folder, c_values)
 
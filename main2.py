@@ -1,193 +1,545 @@
-import networkx as nx
+import contextlib
+import functools
+import numpy as np
 import os
-import random
 import time
 import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from anytime import running_estimates
+from csr_graph import CSRGraph
+from dynamic_bc import DynamicBetweenness
+from graph_cache import load_graph
+from pair_sampling import pair_batches, pair_stopping_rule
+from parallel_sampling import (SharedCSR, attach_csr, dependency_batches, resolve_seed, run_adaptive_multi,
+                               sampling_pool)
+from path_cache import PathCache
+from profiling import RunProfile, phase
+from pruning import PrunedGraph
+from results_store import COMPRESSION_SUFFIXES, STORE_DIR, has_part, write_part, write_result_file
+from shortest_paths import accumulate_dependencies, shortest_path_dag
+from source_samplers import make_sampler
+from top_k import run_top_k
+from true_bc import WEIGHTED_SUFFIX, load_true_betweenness, true_bc_path
 
 class GraphCentralityCalculator:
-    def __init__(self, graph, graph_name):
-        self.G = graph
+    def __init__(self, graph, graph_name, cache_bytes=256 * 2**20, cache_policy='lru', prune=True):
+        # All traversals run on a compact CSR copy of the graph
+        self.graph = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+        # Biconnected blocks, so each sample only searches the blocks of the target nodes
+        self.prune = prune
+        self._pruned = None
         self.graph_name = graph_name  # Save the graph name
-        self.node_list = list(self.G.nodes)
-        self.shortest_paths = {node: {other_node: [] for other_node in self.node_list} for node in self.node_list}
+        self.node_list = self.graph.labels
+        self.node_index = self.graph.label_to_id  # node label -> integer id
+        self.shortest_paths = PathCache(cache_bytes, cache_policy)  # shortest-path DAGs of recently sampled sources
         self.betweenness = {node: 0 for node in self.node_list}
         self.betweenness2 = {node: 0 for node in self.node_list}
         self.betweenness3 = {node: 0 for node in self.node_list}
-        self.degrees = {node: self.G.degree(node) for node in self.node_list}  # Calculate degrees of nodes
-        self.dependencies = {}  # Store dependencies for memoization
-
-    def save_results_to_file(self, true_bc, approx_bc, num_SSP_dict, output_folder, file_name, calculation_time):
-        """Save all results to a single file in the specified format."""
+        self.degrees = dict(zip(self.node_list, self.graph.degrees().tolist()))  # Calculate degrees of nodes
+        self.dynamic = None  # DynamicBetweenness once track_betweenness has been called
+        self.profile = None  # RunProfile of the run in progress, if it is being profiled
+
+    @property
+    def pruned(self):
+        """The PrunedGraph of the current graph, built on first use (None without pruning)."""
+        if self.prune and self._pruned is None:
+            self._pruned = PrunedGraph(self.graph)
+        return self._pruned
+
+    def save_results_to_file(self, true_bc, approx_bc, num_SSP_dict, output_folder, file_name, calculation_time,
+                             nodes=None, compression=None):
+        """Save all results to a single file in the specified format.
+
+        nodes limits the file to those nodes (all nodes with a true BC by default), e.g. the
+        ones that were estimated. compression is None, 'gzip' or 'zstd'.
+        """
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
 
-        total_nodes = len(self.G.nodes)
-
-        file_path = os.path.join(output_folder, f"{self.graph_name}_{file_name}")
-        with open(file_path, 'w') as f:
-            # Write the header
-            f.write(f"Total Nodes: {total_nodes}\n")
-            f.write(f"Calculation Time (seconds): {calculation_time}\n\n")
-            f.write("Node\tDegree\tTrue_BC\tApproximated_BC\tErrorPercentage\tNumSSP\tNumSSP/TotalNodes\n")
-
-            # Write the data for each node
-            for node in true_bc:
-                degree = self.degrees.get(node, 0)  # Get the degree of the node
-                true_bc_value = true_bc[node]
-                approx_bc_value = approx_bc.get(node, 0)  # Get the approximated BC value
-                error_percentage = (abs(true_bc_value - approx_bc_value) / true_bc_value) * 100 if true_bc_value > 0 else 0
-                num_SSP = num_SSP_dict.get(node, 0)  # Get the number of SSP calculations for the node
-                num_SSP_per_node = num_SSP / total_nodes if total_nodes > 0 else 0
-
-                f.write(f"{node}\t{degree}\t{true_bc_value}\t{approx_bc_value}\t{error_percentage:.6f}\t{num_SSP}\t{num_SSP_per_node:.6f}\n")
+        if nodes is None:
+            nodes = list(true_bc)
+        file_path = os.path.join(output_folder, f"{self.graph_name}_{file_name}{COMPRESSION_SUFFIXES[compression]}")
+        write_result_file(file_path, nodes,
+                          [self.degrees.get(node, 0) for node in nodes],
+                          [true_bc[node] for node in nodes],
+                          [approx_bc.get(node, 0) for node in nodes],
+                          [num_SSP_dict.get(node, 0) for node in nodes],
+                          self.graph.number_of_nodes(), calculation_time)
 
         print(f"Results saved to {file_path}")
 
     def shortest_path_calculation(self, s):
-        for node in self.node_list:
-            if len(self.shortest_paths[s][node]) == 0:  # Only calculate if the shortest path is empty
-                if nx.has_path(self.G, node, s):  # Check if a path exists
-                    new_path = nx.shortest_path(self.G, source=node, target=s)  # Get the shortest path from node to s
-                    self.shortest_paths[s][node] = new_path
-
-                    # Propagate the reverse shortest path as well (i.e., from node to s)
-                    self.shortest_paths[node][s] = new_path[::-1]  # Reverse the path from s to node
-
-                    # Automatically propagate shortest paths to other nodes
-                    for i in range(len(new_path) - 1):
-                        u = new_path[i]
-                        v = new_path[i + 1]
-                        if len(self.shortest_paths[u][v]) == 0:  # If we haven't already added the path
-                            self.shortest_paths[u][v] = [u, v]
-                            self.shortest_paths[v][u] = [v, u]  # Also store the reverse path
-                else:
-                    # No path exists between node and s, mark it as empty or some placeholder
-                    self.shortest_paths[s][node] = []
-                    self.shortest_paths[node][s] = []
-
-    def calculate_dependency(self, s, t, v, predecessors):
-        # Base case: if s == t, dependency is zero
-        if s == t:
-            return 0
-        
-        # Memoize the dependency for the pair (s, t)
-        if (s, t, v) in self.dependencies:
-            return self.dependencies[(s, t, v)]
-
-        # Initialize the dependency for the pair (s, t)
-        dependency = 0
-
-        # Iterate over the predecessors of t
-        for w in predecessors[t]:
-            # Recursively calculate the dependency for (s, w)
-            dep_w = self.calculate_dependency(s, w, v, predecessors)
-            # Add to the dependency of (s, t) for vertex v
-            dependency += (1 + dep_w)
-
-        # Memoize the result
-        self.dependencies[(s, t, v)] = dependency
-        return dependency
-
-    def approximate_BC(self, c, top_nodes):
-        n = self.G.number_of_nodes()
-        num_SSP_dict = {node: 0 for node in self.node_list}  # Track num_SSP for each node
-        for v in top_nodes:  # Only iterate over the top nodes
+        """Return the shortest-path DAG from s (BFS, or Dijkstra on weighted graphs) unless s is cached."""
+        dag = self.shortest_paths.get(s)
+        if dag is None:  # Only calculate if s isn't in the cache
+            with phase(self.profile, 'bfs'):
+                dag = shortest_path_dag(self.graph, self.node_index[s])
+            self.shortest_paths.put(s, dag)
+        return dag
+
+    def dependency_vector(self, s):
+        """Return the dependency of source s on every node id, accumulated Brandes-style."""
+        dag = self.shortest_path_calculation(s)
+        with phase(self.profile, 'dependency'):
+            return accumulate_dependencies(dag)
+
+    def store_estimates(self, v, S, k, n):
+        """Turn the running sum S after k samples into the three BC estimates for v."""
+        self.betweenness[v] = S / (k * (n - 1) * (n - 2))
+        denominator = 1
+        for i in range(1, k + 1):
+            denominator *= (n - i)
+        # The exact product overflows a float for large k, so divide in log space. From k = n on
+        # it contains the factor n - n = 0; the estimate has long underflowed to 0 by then
+        self.betweenness2[v] = math.exp(math.log(S) - math.log(denominator)) if S > 0 and denominator > 0 else 0
+        self.betweenness3[v] = (n*S)/k
+
+    def sample_stream(self, target_ids, seed, key, pool=None, pairs=False, sampler=None):
+        """Dependencies of a seeded stream of sampled sources on the target ids, batch by batch.
+
+        Without a pool the samples are computed here, going through the path cache. With pairs
+        every sample is a single shortest path between a random pair of nodes instead. target_ids
+        None means every node; those sources go through multi-source BFS, which pruning would
+        not speed up. sampler draws the sources (uniform by default, see source_samplers). When
+        the run is profiled, every batch is timed as the 'sampling' phase.
+        """
+        if pairs:
+            all_ids = np.arange(self.graph.number_of_nodes())
+            batches = pair_batches(self.graph, all_ids if target_ids is None else target_ids, seed, key)
+        elif pool is not None:
+            batches = pool.batches(target_ids, seed, key, sampler=sampler)
+        elif target_ids is None:
+            batches = dependency_batches(self.graph, None, seed, key, sampler=sampler)
+        elif self.pruned is not None:
+            # The dependencies are computed for the targets only, so there is nothing left to select
+            batches = dependency_batches(self.graph, None, seed, key, dependency=lambda s: self.pruned.dependencies(
+                s, target_ids, self.shortest_paths, self.profile), sampler=sampler)
+        else:
+            batches = dependency_batches(self.graph, target_ids, seed, key,
+                                         dependency=lambda s: self.dependency_vector(self.node_list[s]),
+                                         sampler=sampler)
+        return self.profile.stream(batches) if self.profile is not None else batches
+
+    def approximate_BC_shared(self, c_values, top_nodes, pool=None, seed=None, pairs=False, sampler='uniform'):
+        """Estimate all top nodes from one shared stream of sampled sources, for every c in c_values.
+
+        Every sample's dependency vector is added to the running sum of each node that is still
+        below its threshold for c (c * n, or pair_stopping_rule with pairs); a node stops, with its
+        own k, as soon as it crosses it.
+        """
+        n = self.graph.number_of_nodes()
+        seed = resolve_seed(seed)
+        start_time = time.time()  # Track the start time of the calculations
+
+        targets = []
+        zero = self.graph.zero_betweenness()
+        for v in top_nodes:
+            if zero[self.node_index[v]]:
+                self.betweenness[v] = 0
+                self.betweenness2[v] = 0
+                self.betweenness3[v] = 0
+            else:
+                targets.append(v)
+        target_ids = np.array([self.node_index[v] for v in targets], dtype=np.int64)
+        source_sampler = make_sampler(self.graph, sampler, target_ids)
+        thresholds, max_samples = pair_stopping_rule(c_values, n) if pairs else ([c * n for c in c_values], n)
+        with phase(self.profile, 'accumulation'):
+            S, k, finished = run_adaptive_multi(self.sample_stream(target_ids, seed, 0, pool, pairs, source_sampler),
+                                                len(targets), thresholds, max_samples)
+
+        results = {}
+        for j, c in enumerate(c_values):
+            num_SSP_dict = {node: 0 for node in self.node_list}  # Track num_SSP for each node
+            for i, v in enumerate(targets):
+                num_SSP_dict[v] = int(k[j, i])
+                self.store_estimates(v, float(S[j, i]), int(k[j, i]), n)
+            results[c] = self.estimates(num_SSP_dict, finished[j] - start_time)
+        return results
+
+    def estimates(self, num_SSP_dict, calculation_time):
+        """The current estimates as the tuple approximate_BC returns, copied so later runs leave them alone."""
+        return dict(self.betweenness), dict(self.betweenness2), dict(self.betweenness3), num_SSP_dict, calculation_time
+
+    def approximate_BC(self, c, top_nodes, shared=False, workers=1, seed=None, pairs=False, sampler='uniform'):
+        """Adaptive-sampling BC estimates for the top nodes.
+
+        With workers > 1 the sampled sources are computed by a process pool. The samples come
+        from per-batch streams derived from seed, so a given seed gives the same results for
+        any number of workers. With pairs each sample is one shortest path between a random
+        source-target pair, found with a bidirectional search; those run in this process and
+        stop by pair_sampling.pair_stopping_rule, which takes about PAIR_HITS * c paths per node.
+        sampler is a strategy of source_samplers.SAMPLERS for drawing the sources: importance
+        samplers reweight every sample, so the estimates stay unbiased, and 'distance' favours
+        the sources near the nodes being estimated.
+        """
+        return self.approximate_BC_multi([c], top_nodes, shared, workers, seed, pairs, sampler)[c]
+
+    def approximate_BC_multi(self, c_values, top_nodes, shared=False, workers=1, seed=None, pairs=False,
+                             sampler='uniform'):
+        """approximate_BC for every c in c_values from a single sampling run.
+
+        Sampling only goes on up to the largest c; for a smaller c every node's S and k are
+        taken at the sample that took it over its threshold, where a run for that c alone would
+        have stopped on the same stream. Returns {c: the tuple approximate_BC returns}, with as
+        calculation time the time until the last node had reached that c.
+        """
+        if pairs and sampler != 'uniform':
+            raise ValueError("Pair sampling draws its pairs uniformly; use source sampling for other samplers")
+        with sampling_pool(self.graph, 1 if pairs else workers, self.pruned) as pool:  # pairs run in this process
+            if shared:
+                return self.approximate_BC_shared(c_values, top_nodes, pool, seed, pairs, sampler)
+            return self.approximate_BC_per_node(c_values, top_nodes, pool, seed, pairs, sampler)
+
+    def approximate_BC_per_node(self, c_values, top_nodes, pool=None, seed=None, pairs=False, sampler='uniform'):
+        n = self.graph.number_of_nodes()
+        seed = resolve_seed(seed)
+        S = np.zeros((len(c_values), len(top_nodes)))
+        k = np.zeros((len(c_values), len(top_nodes)), dtype=np.int64)
+        calculation_time = np.zeros(len(c_values))  # Track the time of the calculations, over all nodes
+        source_sampler = make_sampler(self.graph, sampler) if sampler != 'distance' else None  # the same for every node
+        thresholds, max_samples = pair_stopping_rule(c_values, n) if pairs else ([c * n for c in c_values], n)
+        zero = self.graph.zero_betweenness()
+        for i, v in enumerate(top_nodes):  # Only iterate over the top nodes
             print(f'Looking at node {v} out of {n}')
-            Degree = self.G.degree(v)
-            if Degree == 0 or Degree == 1:  # if the degree of v is 0 or 1 then the BC is automatically 0
+            v_id = self.node_index[v]
+            if zero[v_id]:
                 self.betweenness[v] = 0
                 self.betweenness2[v] = 0
                 self.betweenness3[v] = 0
             else:
-                S = 0
-                k = 0  # Counter for the number of samples
-
-                start_time = time.time()  # Track the start time of the calculations
-
-                while S < c * n:
-                    s = random.choice(list(self.G.nodes))  # sample a random node
-                    k += 1  # Increment the number of samples
-                    self.shortest_path_calculation(s)  # calculate all shortest paths from s to all other nodes
-                    num_SSP_dict[v] += 1  # increase number of SSP calcs done for this specific node
-                    predecessors = {node: set() for node in self.node_list}  # add all predecessors from the paths from s
-                    for target, path in self.shortest_paths[s].items():
-                        for i in range(1, len(path)):  # Skip the source vertex
-                            predecessors[path[i]].add(path[i-1])  # Add the predecessor to the set
-                    total_dependency = 0
-                    for target, path in self.shortest_paths[s].items():
-                        if target == s:  # Skip the source vertex
-                            continue
-                        if v in path:
-                            total_dependency += self.calculate_dependency(s, target, v, predecessors)
-                    S += total_dependency
-                self.betweenness[v] = S / (k * (n - 1) * (n - 2))
-                denominator = 1
-                for i in range(1, k + 1):
-                    denominator *= (n - i)
-                self.betweenness2[v] =  S/ denominator
-                self.betweenness3[v] = (n*S)/k
-
-                end_time = time.time()  # Track the end time of the calculations
-                calculation_time = end_time - start_time  # Calculate the total calculation time
-
-        return self.betweenness, self.betweenness2, self.betweenness3, num_SSP_dict, calculation_time
-
-
-def load_true_betweenness(file_path):
-    """Load true betweenness centrality values from a file."""
-    true_bc = {}
-    with open(file_path, 'r') as f:
-        next(f)  # Skip header
-        for line in f:
-            node, bc_value = line.strip().split('\t')
-            true_bc[node] = float(bc_value)
-    return true_bc
-
-
-def process_graph(input_file, output_folder, c_values):
-    # Load the graph from the specified file
-    G = nx.read_graphml(input_file)
+                start_time = time.time()  # Track the start time of the calculations for this node
+                # Sample until S crosses the threshold (or the cap), each node with its own stream of sources
+                node_sampler = source_sampler or make_sampler(self.graph, sampler, [v_id])
+                with phase(self.profile, 'accumulation'):
+                    S[:, i:i + 1], k[:, i:i + 1], finished = run_adaptive_multi(
+                        self.sample_stream(np.array([v_id]), seed, v_id + 1, pool, pairs, node_sampler), 1,
+                        thresholds, max_samples)
+                calculation_time += finished - start_time  # this node's share of every c
+
+        results = {}
+        for j, c in enumerate(c_values):
+            num_SSP_dict = {node: 0 for node in self.node_list}  # Track num_SSP for each node
+            for i, v in enumerate(top_nodes):
+                if k[j, i] > 0:
+                    num_SSP_dict[v] = int(k[j, i])  # number of SSP calcs done for this specific node
+                    self.store_estimates(v, float(S[j, i]), int(k[j, i]), n)
+            results[c] = self.estimates(num_SSP_dict, float(calculation_time[j]))
+        return results
+
+    def betweenness_snapshots(self, nodes=None, every=256, delta=0.05, bound='bernstein', max_samples=None,
+                              workers=1, seed=None, pairs=False, per_node=False):
+        """Yield running BC estimates of the nodes (every node by default) every `every` samples.
+
+        Each anytime.Snapshot holds the sample count, the elapsed time and, per node, the
+        estimate normalized like the true BC files and its confidence interval; all intervals of
+        all snapshots hold together with probability 1 - delta (each node's with probability
+        1 - delta with per_node, see anytime.running_estimates). Stop iterating whenever the
+        estimates are good enough or the time is up; the sampling stops with the loop. Without
+        max_samples the stream only ends when the caller stops.
+        """
+        n = self.graph.number_of_nodes()
+        seed = resolve_seed(seed)
+        target_ids = None if nodes is None else np.array([self.node_index[v] for v in nodes], dtype=np.int64)
+        with sampling_pool(self.graph, 1 if pairs else workers, self.pruned) as pool:
+            batches = self.sample_stream(target_ids, seed, 0, pool, pairs)
+            # A pair sample scores n - 1, a source's dependency at most n - 2
+            yield from running_estimates(batches, n, every, delta, bound, max_samples, n - 1 if pairs else None,
+                                         per_node)
+
+    def top_k_betweenness(self, k, delta=0.05, bound='bernstein', tolerance=0.1, max_samples=None, workers=1,
+                          seed=None):
+        """Find the k nodes with the highest BC without a ground truth file.
+
+        Sources are sampled uniformly and every sample updates the running sum of every node.
+        Sampling stops as soon as the confidence intervals (see top_k.run_top_k) separate the
+        top k from the other nodes with probability 1 - delta, or after max_samples samples
+        (n by default). tolerance is the fraction of the k-th BC by which nodes around the
+        cut-off may be swapped.
+        Returns the top nodes (highest first), their estimated normalized BC, the number of
+        samples and the calculation time.
+        """
+        n = self.graph.number_of_nodes()
+        seed = resolve_seed(seed)
+        start_time = time.time()  # Track the start time of the calculations
+
+        with sampling_pool(self.graph, workers) as pool:
+            # Every sample needs the dependencies on all nodes, so the sources go through multi-source BFS
+            batches = pool.batches(None, seed) if pool is not None else dependency_batches(self.graph, None, seed)
+            S, samples, separated = run_top_k(batches, n, k, delta, bound, tolerance, max_samples)
+        if not separated:
+            print(f"Top {k} of {self.graph_name} not separated after {samples} samples; "
+                  f"the ranking near the cut-off may be wrong")
+
+        estimates = S / (samples * (n - 1) * (n - 2)) * n if n > 2 else np.zeros(n)  # normalized like the true BC files
+        top = np.argsort(-estimates, kind='stable')[:k]
+        top_nodes = [self.node_list[i] for i in top.tolist()]
+        top_bc = {node: float(estimates[i]) for node, i in zip(top_nodes, top.tolist())}
+        calculation_time = time.time() - start_time
+        return top_nodes, top_bc, samples, calculation_time
+
+
+    def track_betweenness(self, num_sources=None, seed=None):
+        """Start keeping BC up to date under add_edge and remove_edge.
+
+        Every node is a source by default, which keeps the exact BC (and costs 20 bytes per
+        node pair); with num_sources only a uniform sample of sources is kept and the BC is
+        an estimate. Returns the current BC of every node.
+        """
+        n = self.graph.number_of_nodes()
+        if num_sources is None or num_sources >= n:
+            sources = np.arange(n)
+        else:
+            sources = np.random.default_rng(seed).choice(n, num_sources, replace=False)
+        self.dynamic = DynamicBetweenness(self.graph, sources)
+        return self.tracked_betweenness()
+
+    def tracked_betweenness(self):
+        """The current BC of every node, as {node: value}, kept by track_betweenness."""
+        return dict(zip(self.node_list, self.dynamic.betweenness().tolist()))
+
+    def add_edge(self, u, v, weight=None):
+        """Add the edge between nodes u and v (labels), updating the tracked BC if there is one.
+
+        On a weighted graph weight is the length of the new edge; it must be None otherwise.
+        """
+        u_id, v_id = self.node_index[u], self.node_index[v]
+        if self.dynamic is not None:
+            self.dynamic.add_edge(u_id, v_id, weight)
+            self.graph = self.dynamic.graph
+        else:
+            self.graph = self.graph.with_edge(u_id, v_id, weight)
+        self.edges_changed(u, v)
+
+    def remove_edge(self, u, v):
+        """Remove the edge between nodes u and v (labels), updating the tracked BC if there is one."""
+        u_id, v_id = self.node_index[u], self.node_index[v]
+        if self.dynamic is not None:
+            self.dynamic.remove_edge(u_id, v_id)
+            self.graph = self.dynamic.graph
+        else:
+            self.graph = self.graph.without_edge(u_id, v_id)
+        self.edges_changed(u, v)
+
+    def edges_changed(self, u, v):
+        """Drop everything computed on the graph before an edge between u and v changed."""
+        self.degrees[u] = self.graph.degree(self.node_index[u])
+        self.degrees[v] = self.graph.degree(self.node_index[v])
+        self.shortest_paths.clear()
+        self._pruned = None
+
+
+def graph_name_of(input_file, weighted=False):
+    """Name of a graph's runs: the file name, plus WEIGHTED_SUFFIX for runs that use the edge weights."""
     graph_name = os.path.basename(input_file).split('.')[0]  # Extract graph name from the file name
+    return graph_name + WEIGHTED_SUFFIX if weighted else graph_name
+
+
+def result_paths(output_folder, graph_name, c, rep, compression=None):
+    """Paths of the three result files (one per estimator) written for one repetition."""
+    file_name = f"{graph_name}_results_c{c}_rep{rep}.txt{COMPRESSION_SUFFIXES[compression]}"
+    return [os.path.join(output_folder, f"{variant}_c{c}", file_name)
+            for variant in ('Results', 'ResultsAlt2', 'ResultsAlt3')]
+
+
+_shared_graphs = {}  # input file -> graph attached to the parent's shared memory, in run_experiments' workers
+
+
+def _attach_graphs(graphs):
+    """Pool initializer: attach the graphs run_experiments put in shared memory, {input file: (handle, labels)}."""
+    for input_file, (handle, labels) in graphs.items():
+        _shared_graphs[input_file] = attach_csr(handle, labels)
+
+
+@functools.lru_cache(maxsize=1)
+def load_experiment(input_file, weighted=False):
+    """Load a graph, its true betweenness and its top 30 nodes.
+
+    By default the edge weights (Cite and Road have them) are dropped and the graph is
+    estimated and scored on hop counts; with weighted they are lengths, and the true BC of a
+    graph that has them comes from its weighted file (see exact_bc.calculate_and_save_betweenness). Cached, so
+    consecutive tasks on the same graph in one process share the loaded graph (and the
+    calculator's path cache). In the workers of run_experiments the graph comes from the
+    parent's shared memory instead.
+    """
+    # Load the graph from the specified file
+    G = _shared_graphs.get(input_file)
+    if G is None:
+        G = load_graph(input_file, weighted=weighted)  # parsed once, then memory-mapped from the binary cache
+    graph_name = graph_name_of(input_file, weighted)
     print(f"Processing graph: {graph_name}")
-    
+
     calculator = GraphCentralityCalculator(G, graph_name)
 
-    # Load true betweenness centrality values from the corresponding file
-    true_bc_file_path = os.path.join('BetweennessCentrality', f'betweenness_centrality_{graph_name}.txt')
-    true_bc = load_true_betweenness(true_bc_file_path)
-
-    # Sort nodes by true BC values and select the top 30 nodes
-    top_nodes = sorted(true_bc, key=true_bc.get, reverse=True)[:30]
-
-    for c in c_values:
-        print(f"Calculating Betweenness Centrality for c={c}...")
-
-        # Create output folder for the specific value of c
-        c_output_folder = os.path.join(output_folder, f"Results_c{c}")
-        c_output_folder2 = os.path.join(output_folder, f"ResultsAlt2_c{c}")
-        c_output_folder3 = os.path.join(output_folder, f"ResultsAlt3_c{c}")
-        
-        if not os.path.exists(c_output_folder):
-            os.makedirs(c_output_folder)
-        if not os.path.exists(c_output_folder2):
-            os.makedirs(c_output_folder2)
-        if not os.path.exists(c_output_folder3):
-            os.makedirs(c_output_folder3)
-
-        for rep in range(5):
-            print(f'Repetition {rep}')
-            betweenness, betweenness2, betweenness3, num_SSP_dict, calculation_time = calculator.approximate_BC(c, top_nodes)
-
-            # Save all results in a single file
-            calculator.save_results_to_file(true_bc, betweenness, num_SSP_dict, c_output_folder, f"results_c{c}_rep{rep}.txt", calculation_time)
-            calculator.save_results_to_file(true_bc, betweenness2, num_SSP_dict, c_output_folder2, f"results_c{c}_rep{rep}.txt", calculation_time)
-            calculator.save_results_to_file(true_bc, betweenness3, num_SSP_dict, c_output_folder3, f"results_c{c}_rep{rep}.txt", calculation_time)
-
-def process_all_graphs(input_folder, output_folder, c_values):
-    for file_name in os.listdir(input_folder):
-        if file_name.endswith('.graphml'):  # Handle .graphml files
-            file_path = os.path.join(input_folder, file_name)
-            process_graph(file_path, output_folder, c_values)
+    # Load true betweenness centrality values from the corresponding file, memory-mapped after the first load
+    # (a graph without edge weights has only the hop-count one, which is its weighted BC too)
+    true_bc = load_true_betweenness(true_bc_path(graph_name_of(input_file), G.weighted))
+
+    # Select the 30 nodes with the highest true BC values
+    top_nodes = true_bc.top_k(30)
+    return calculator, true_bc, top_nodes
+
+
+def convergence_curve(input_file, every=64, max_samples=None, workers=1, seed=None, pairs=False, weighted=False,
+                      bound='bernstein', per_node=False):
+    """Mean relative error and interval half-width on the top nodes against the number of samples.
+
+    One sampling run gives the whole curve: the top nodes are estimated from a single stream
+    and compared to the true BC at every snapshot. max_samples defaults to n. Returns three
+    arrays: the sample counts, the mean relative errors and the mean relative half-widths.
+    weighted is passed on to load_experiment; bound and per_node choose the intervals, as in
+    betweenness_snapshots.
+    """
+    calculator, true_bc, top_nodes = load_experiment(input_file, weighted)
+    n = calculator.graph.number_of_nodes()
+    truth = np.array([true_bc[node] for node in top_nodes])
+    scale = np.where(truth > 0, truth, 1)  # nodes with a true BC of 0 count the absolute error
+    samples, errors, widths = [], [], []
+    for snapshot in calculator.betweenness_snapshots(top_nodes, every, bound=bound, max_samples=n if max_samples is None
+                                                     else max_samples, workers=workers, seed=seed, pairs=pairs,
+                                                     per_node=per_node):
+        samples.append(snapshot.samples)
+        errors.append(np.mean(np.abs(snapshot.estimate - truth) / scale))
+        widths.append(np.mean(snapshot.radius / scale))
+    return np.array(samples), np.array(errors), np.array(widths)
+
+
+def rank_graph(input_file, k=30, delta=0.05, workers=1, seed=None):
+    """Print the estimated top k nodes of a graph that has no true betweenness file yet."""
+    graph_name = graph_name_of(input_file)
+    calculator = GraphCentralityCalculator(load_graph(input_file), graph_name, prune=False)
+    top_nodes, top_bc, samples, calculation_time = calculator.top_k_betweenness(k, delta, workers=workers, seed=seed)
+    n = calculator.graph.number_of_nodes()
+    print(f"Top {k} of {graph_name} from {samples} samples ({samples / n:.1%} of n) in {calculation_time:.1f} seconds")
+    for node in top_nodes:
+        print(f"{node}\t{top_bc[node]}")
+    return top_nodes, top_bc
+
+
+def profile_path(output_folder, graph_name, c, rep):
+    """Path of the JSON lines file that the profile of one repetition is appended to."""
+    return os.path.join(output_folder, 'Profiles', f"{graph_name}_c{c}_rep{rep}.jsonl")
+
+
+def run_task(input_file, output_folder, c, rep, shared=False, workers=1, seed=None, store=STORE_DIR,
+             estimated_only=False, compression=None, profile=False, trace_memory=False, weighted=False):
+    """Run one repetition for one graph and value of c, or for a list of values of c at once.
+
+    The results go to the three result files and, for the top nodes, to the results store.
+    With estimated_only the result files only list the top nodes. With profile the time spent
+    loading, searching ('bfs'), accumulating dependencies ('dependency'), summing and testing
+    the samples ('accumulation') and writing, the samples per second, the samples per node and
+    the peak memory go to a JSON lines file under output_folder/Profiles (see profiling.RunProfile;
+    trace_memory adds tracemalloc peaks).
+    A list of values of c is estimated from a single sampling run (see approximate_BC_multi),
+    seeded like a run for the largest c alone, and written as if every c had run on its own;
+    only the values of c that have no part in the store yet are written. With weighted the
+    edge weights are lengths (see load_experiment) and the results go under graph_name_of's
+    weighted name.
+    """
+    c_values = sorted(c) if isinstance(c, (list, tuple)) else [c]
+    graph_name = graph_name_of(input_file, weighted)
+    written = [c for c in c_values if len(c_values) == 1 or not has_part(store, graph_name, c, rep)] or c_values
+    label = c if len(c_values) == 1 else '-'.join(map(str, c_values))
+    run_profile = RunProfile(trace_memory, graph=graph_name, c=c, rep=rep) if profile else None
+    with phase(run_profile, 'load'):
+        calculator, true_bc, top_nodes = load_experiment(input_file, weighted)
+    calculator.profile = run_profile
+    print(f"Calculating Betweenness Centrality for {calculator.graph_name}, c={label}, repetition {rep}...")
+    try:
+        results = calculator.approximate_BC_multi(c_values, top_nodes, shared, workers,
+                                                  None if seed is None else (seed, c_values[-1], rep))
+    finally:
+        calculator.profile = None  # the calculator is shared with the next task on this graph
+    cache = calculator.shortest_paths.stats()
+    print(f"Path cache: {cache['hits']} hits, {cache['misses']} misses, {cache['entries']} sources kept")
+
+    for c_value in written:
+        betweenness, betweenness2, betweenness3, num_SSP_dict, calculation_time = results[c_value]
+        with phase(run_profile, 'write'):
+            # Save all results in a single file per estimator
+            for approx_bc, file_path in zip((betweenness, betweenness2, betweenness3),
+                                            result_paths(output_folder, calculator.graph_name, c_value, rep, compression)):
+                calculator.save_results_to_file(true_bc, approx_bc, num_SSP_dict, os.path.dirname(file_path),
+                                                f"results_c{c_value}_rep{rep}.txt", calculation_time,
+                                                top_nodes if estimated_only else None, compression)
+            # The store part is written last, so its presence marks the task as done
+            write_part(store, calculator.graph_name, c_value, rep, top_nodes,
+                       [calculator.degrees[node] for node in top_nodes],
+                       [true_bc[node] for node in top_nodes],
+                       [[approx_bc[node] for node in top_nodes] for approx_bc in (betweenness, betweenness2, betweenness3)],
+                       [num_SSP_dict[node] for node in top_nodes],
+                       calculator.graph.number_of_nodes(), calculation_time)
+    if run_profile is not None:
+        run_profile.num_ssp = {str(node): results[c_values[-1]][3][node] for node in top_nodes}
+        run_profile.write(profile_path(output_folder, calculator.graph_name, label, rep))
+    return calculator.graph_name, label, rep
+
+
+def run_experiments(input_files, output_folder, c_values, reps=5, jobs=1, shared=False, workers=1, seed=None,
+                    store=STORE_DIR, estimated_only=False, compression=None, profile=False, trace_memory=False,
+                    multi_c=False, weighted=False):
+    """Run every (graph, c, repetition) task, on a pool of `jobs` processes when jobs > 1.
+
+    The largest graphs and values of c are started first so no big task is left running on its
+    own at the end. Every task writes its results as soon as it finishes, and tasks that already
+    have a part in the results store are skipped, so an interrupted grid can simply be started again.
+    workers is the number of sampling processes used inside each task; estimated_only,
+    compression, profile and trace_memory are passed on to run_task. With multi_c every
+    (graph, repetition) is one task that samples once for all of c_values, which costs about as
+    much as the largest c alone; it is run if any of its values of c is missing from the store.
+    With weighted the edge weights are lengths and every estimate is scored against the
+    weighted true BC; those results are stored apart from the hop-count ones.
+    """
+    input_files = sorted(input_files, key=os.path.getsize, reverse=True)
+    if multi_c:
+        tasks = [(input_file, sorted(c_values), rep) for input_file in input_files for rep in range(reps)]
+    else:
+        tasks = [(input_file, c, rep) for input_file in input_files
+                 for c in sorted(c_values, reverse=True)
+                 for rep in range(reps)]
+    todo = [(input_file, c, rep) for input_file, c, rep in tasks
+            if not all(has_part(store, graph_name_of(input_file, weighted), c_value, rep)
+                       for c_value in (c if multi_c else [c]))]
+    print(f"{len(tasks) - len(todo)} of {len(tasks)} tasks already done")
+
+    if jobs <= 1:
+        for input_file, c, rep in todo:
+            run_task(input_file, output_folder, c, rep, shared, workers, seed, store, estimated_only, compression,
+                     profile, trace_memory, weighted)
+        return
+
+    # Every graph is loaded once, here, and its arrays put in shared memory, so the workers
+    # neither parse it again nor keep their own copy
+    with contextlib.ExitStack() as stack:
+        graphs = {}
+        for input_file in dict.fromkeys(input_file for input_file, _, _ in todo):
+            shared_csr = stack.enter_context(SharedCSR(load_graph(input_file, weighted=weighted)))
+            graphs[input_file] = (shared_csr.handle, shared_csr.graph.labels)
+        with ProcessPoolExecutor(jobs, initializer=_attach_graphs, initargs=(graphs,)) as pool:
+            futures = [pool.submit(run_task, input_file, output_folder, c, rep, shared, workers, seed, store,
+                                   estimated_only, compression, profile, trace_memory, weighted)
+                       for input_file, c, rep in todo]  # submitted in order, so big graphs go first
+            for future in as_completed(futures):
+                graph_name, c, rep = future.result()
+                print(f"Finished {graph_name} c={c} repetition {rep}")
+
+
+def process_graph(input_file, output_folder, c_values, shared=False, workers=1, seed=None, estimated_only=False,
+                  compression=None, profile=False, trace_memory=False, multi_c=False, weighted=False):
+    run_experiments([input_file], output_folder, c_values, shared=shared, workers=workers, seed=seed,
+                    estimated_only=estimated_only, compression=compression, profile=profile,
+                    trace_memory=trace_memory, multi_c=multi_c, weighted=weighted)
+
+
+def process_all_graphs(input_folder, output_folder, c_values, shared=False, workers=1, seed=None, jobs=1,
+                       estimated_only=False, compression=None, profile=False, trace_memory=False, multi_c=False,
+                       weighted=False):
+    input_files = [os.path.join(input_folder, file_name) for file_name in os.listdir(input_folder)
+                   if file_name.endswith('.graphml')]  # Handle .graphml files
+    run_experiments(input_files, output_folder, c_values, jobs=jobs, shared=shared, workers=workers, seed=seed,
+                    estimated_only=estimated_only, compression=compression, profile=profile,
+                    trace_memory=trace_memory, multi_c=multi_c, weighted=weighted)
 
 if __name__ == "__main__":
 
@@ -197,7 +549,10 @@ if __name__ == "__main__":
     c_values = [2, 3, 4, 5]  # Values of c to iterate over
 
     # Uncomment the next line to process all graphs in the folder
-    process_all_graphs(input_folder, output_folder, c_values)
+    # Only the top nodes are estimated, so only they are written out
+    # Pass multi_c=True to get every c from one sampling run per graph and repetition, and
+    # weighted=True to use the edge weights (needs the weighted true BC files, see exact_bc.py)
+    process_all_graphs(input_folder, output_folder, c_values, jobs=os.cpu_count(), estimated_only=True)
 
 
     #single_graph = "GraphsNetworkX/Rand.graphml"  # Specify the graph file you want to process
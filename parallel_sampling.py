@@ -0,0 +1,246 @@
+import contextlib
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from csr_graph import CSRGraph
+from shortest_paths import batch_dependencies, sum_dependencies
+from source_samplers import UniformSampler
+
+SWEEP_SOURCES = 64  # sources searched together by one multi-source BFS
+
+
+def batch_rng(seed, key, batch):
+    """The random generator of one batch of a sample stream, seeded with (seed, key, batch).
+
+    seed is an int or a tuple of ints.
+    """
+    entropy = (seed if isinstance(seed, tuple) else (seed,)) + (key, batch)
+    return np.random.default_rng(list(entropy))
+
+
+def resolve_seed(seed):
+    """seed, or a fresh one if it is None; drawn from random, so random.seed() still makes runs reproducible."""
+    return random.getrandbits(63) if seed is None else seed
+
+
+def sample_sources(seed, key, batch, batch_size, n, num_batches=1, sampler=None):
+    """Return the sources of num_batches consecutive batches of the sample stream, in order, and their weights.
+
+    Every batch draws from its own generator, so the stream is the same no matter how many
+    processes end up computing it, or how many batches are searched together. sampler is one
+    of source_samplers (uniform by default); the weights are None when every sample counts once.
+    """
+    sampler = UniformSampler(n) if sampler is None else sampler
+    draws = [sampler.draw(batch_rng(seed, key, batch + i), batch_size) for i in range(num_batches)]
+    weights = None if draws[0][1] is None else np.concatenate([weight for _, weight in draws])
+    return np.concatenate([sources for sources, _ in draws]), weights
+
+
+class SharedCSR:
+    """Copy of a CSRGraph's arrays in shared memory, so pool workers can attach without pickling."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.blocks = []
+        self.handle = None
+
+    def __enter__(self):
+        handle = []
+        arrays = (self.graph.indptr, self.graph.indices) + ((self.graph.weights,) if self.graph.weighted else ())
+        for array in arrays:
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self.blocks.append(block)
+            handle.append((block.name, array.shape, array.dtype.str))
+        self.handle = tuple(handle)
+        return self
+
+    def __exit__(self, *exc):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+_worker_graph = None
+_worker_pruned = None
+_worker_blocks = []  # keep the shared memory mapped for the worker's lifetime
+
+
+def attach_csr(handle, labels=None):
+    """A CSRGraph on the arrays of a SharedCSR's handle, without copying them; labels default to the node ids."""
+    arrays = []
+    for name, shape, dtype in handle:
+        block = SharedMemory(name=name)
+        _worker_blocks.append(block)
+        arrays.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+    indptr, indices = arrays[:2]
+    weights = arrays[2] if len(arrays) > 2 else None
+    return CSRGraph(range(len(indptr) - 1) if labels is None else labels, indptr, indices, weights)
+
+
+def _init_worker(handle, pruned=None):
+    global _worker_graph, _worker_pruned
+    _worker_pruned = pruned
+    _worker_graph = attach_csr(handle)
+
+
+def _sample_batch(sources, target_ids, backend='msbfs'):
+    if _worker_pruned is not None and target_ids is not None:
+        # only searches the blocks of the targets
+        return np.stack([_worker_pruned.dependencies(s, target_ids) for s in sources.tolist()])
+    rows = batch_dependencies(_worker_graph, sources, SWEEP_SOURCES, backend)
+    return rows if target_ids is None else rows[:, target_ids]  # one array per batch crosses the process boundary
+
+
+def _sum_batch(sources):
+    return sum_dependencies(_worker_graph, sources, SWEEP_SOURCES)
+
+
+def dependency_batches(graph, target_ids, seed, key=0, batch_size=16, dependency=None, backend='msbfs',
+                       sampler=None):
+    """Yield the dependencies of sampled sources on the target nodes, in stream order.
+
+    Each item is an array with one row per sample and one column per entry of target_ids
+    (every node if target_ids is None), computed in this process. By default the sources of
+    several batches are searched together by the batch_dependencies backend (a multi-source
+    BFS unless told otherwise); with dependency(s) they are handled one at a time, a row each.
+    The sources are drawn by sampler (see sample_sources) and every row is multiplied by its
+    sample's weight. The stream never ends, so close the generator once enough samples have
+    been consumed.
+    """
+    n = graph.number_of_nodes()
+    batch = 0
+    if dependency is None:
+        sweep = max(1, SWEEP_SOURCES // batch_size)
+        while True:
+            sources, weights = sample_sources(seed, key, batch, batch_size, n, sweep, sampler)
+            rows = batch_dependencies(graph, sources, SWEEP_SOURCES, backend)
+            rows = rows if target_ids is None else rows[:, target_ids]
+            yield rows if weights is None else rows * weights[:, np.newaxis]
+            batch += sweep
+    while True:
+        sources, weights = sample_sources(seed, key, batch, batch_size, n, sampler=sampler)
+        for i, s in enumerate(sources.tolist()):
+            delta = dependency(s)
+            delta = delta if target_ids is None else delta[target_ids]
+            yield (delta if weights is None else delta * weights[i])[np.newaxis]
+        batch += 1
+
+
+class SamplingPool:
+    """Process pool whose workers read one CSRGraph from shared memory.
+
+    batches() yields the same stream as dependency_batches, but whole batches of sources
+    are computed by the workers, so results do not depend on the number of workers. Every
+    task holds enough batches for one multi-source BFS. With a PrunedGraph the workers
+    compute target dependencies block by block.
+    """
+
+    def __init__(self, graph, workers, pruned=None):
+        self.graph = graph
+        self.workers = workers
+        self.pruned = pruned
+        self.shared = SharedCSR(graph)
+        self.executor = None
+
+    def __enter__(self):
+        self.shared.__enter__()
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(self.shared.handle, self.pruned))
+        return self
+
+    def __exit__(self, *exc):
+        self.executor.shutdown(cancel_futures=True)
+        self.shared.__exit__(*exc)
+
+    def sum_dependencies(self, sources):
+        """Submit sum(delta_s) over the given sources to a worker and return the future."""
+        return self.executor.submit(_sum_batch, np.asarray(sources))
+
+    def batches(self, target_ids, seed, key=0, batch_size=16, backend='msbfs', sampler=None):
+        n = self.graph.number_of_nodes()
+        sweep = max(1, SWEEP_SOURCES // batch_size)
+        pending = deque()  # (future, sample weights)
+        batch = 0
+        try:
+            while True:
+                while len(pending) < 2 * self.workers:  # keep every worker busy while we reduce
+                    sources, weights = sample_sources(seed, key, batch, batch_size, n, sweep, sampler)
+                    pending.append((self.executor.submit(_sample_batch, sources, target_ids, backend), weights))
+                    batch += sweep
+                future, weights = pending.popleft()
+                rows = future.result()
+                yield rows if weights is None else rows * weights[:, np.newaxis]
+        finally:
+            for future, _ in pending:
+                future.cancel()
+
+
+def sampling_pool(graph, workers, pruned=None):
+    """A SamplingPool when workers > 1; otherwise a context that gives None, to sample in this process."""
+    return SamplingPool(graph, workers, pruned) if workers > 1 else contextlib.nullcontext()
+
+
+def run_adaptive(batches, num_targets, threshold, max_samples=None):
+    """Consume dependency batches until every target's running sum reaches threshold.
+
+    A target stops at the exact sample that takes it over the threshold, as if the samples
+    had been added one by one, or after max_samples samples if it has not got there by then:
+    a node on no shortest path (e.g. one whose neighbours are all adjacent) has dependency 0
+    for every source and would never stop. Returns the running sums S and sample counts k per target.
+    """
+    S, k, _ = run_adaptive_multi(batches, num_targets, [threshold], max_samples)
+    return S[0], k[0]
+
+
+def run_adaptive_multi(batches, num_targets, thresholds, max_samples=None):
+    """run_adaptive for several thresholds in one pass over the stream.
+
+    The batches are consumed until every target has reached the largest threshold, or for at
+    most max_samples samples. For each threshold the running sum and sample count of every
+    target are recorded at the sample that took it over (or at the cap), which is exactly where
+    run_adaptive with that threshold would have stopped on the same stream. Returns S and k
+    with one row per threshold, and for every threshold the time.time() at which the last
+    target reached it.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    S = np.zeros((len(thresholds), num_targets))
+    k = np.zeros((len(thresholds), num_targets), dtype=np.int64)
+    finished = np.full(len(thresholds), time.time())
+    total = np.zeros(num_targets)  # running sum of every target
+    samples = 0  # samples added so far to every target still active
+    pending = np.ones((len(thresholds), num_targets), dtype=bool)  # thresholds not reached yet
+    active = np.arange(num_targets)
+    try:
+        while len(active) > 0:
+            deltas = next(batches)
+            if max_samples is not None:
+                deltas = deltas[:max_samples - samples]
+            # Running sums after each sample of the batch, added in sample order
+            sums = np.cumsum(np.vstack([total[active], deltas[:, active]]), axis=0)[1:]
+            capped = max_samples is not None and samples + len(deltas) >= max_samples
+            for j, threshold in enumerate(thresholds):
+                crossed = sums >= threshold
+                crossed[-1] |= capped  # at the cap every target stops where it is
+                done = crossed.any(axis=0) & pending[j, active]
+                if not done.any():
+                    continue
+                first = crossed.argmax(axis=0)[done]
+                ids = active[done]
+                S[j, ids] = sums[first, np.flatnonzero(done)]
+                k[j, ids] = samples + first + 1
+                pending[j, ids] = False
+                if not pending[j].any():
+                    finished[j] = time.time()
+            total[active] = sums[-1]
+            samples += len(deltas)
+            active = active[pending[:, active].any(axis=0)]
+    finally:
+        batches.close()
+    return S, k, finished
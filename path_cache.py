@@ -0,0 +1,76 @@
+from collections import OrderedDict
+
+
+class PathCache:
+    """Bounded cache of per-source shortest-path DAGs.
+
+    Entries are evicted once their total size exceeds max_bytes, either least recently used
+    ('lru') or least frequently used ('lfu', ties broken by recency). A DAG larger than the
+    whole budget is never stored, so max_bytes=0 turns caching off.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, policy='lru'):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.entries = OrderedDict()  # source -> DAG, least recently used first
+        self.frequency = {}  # source -> number of lookups that hit it
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, source):
+        return source in self.entries
+
+    def get(self, source):
+        """Return the cached DAG for source, or None, and update the hit/miss counters."""
+        dag = self.entries.get(source)
+        if dag is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(source)
+        self.frequency[source] += 1
+        return dag
+
+    def put(self, source, dag):
+        size = dag.nbytes
+        if size > self.max_bytes:
+            return
+        if source in self.entries:
+            self.bytes -= self.entries.pop(source).nbytes
+        while self.bytes + size > self.max_bytes:
+            self._evict()
+        self.entries[source] = dag
+        self.frequency.setdefault(source, 0)
+        self.bytes += size
+
+    def _evict(self):
+        if self.policy == 'lru':
+            victim = next(iter(self.entries))
+        else:
+            victim = min(self.entries, key=self.frequency.__getitem__)  # first minimum is the least recent
+        self.bytes -= self.entries.pop(victim).nbytes
+        del self.frequency[victim]
+        self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.frequency.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+        }
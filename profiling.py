@@ -0,0 +1,110 @@
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process in bytes, or None where the resource module is missing."""
+    try:
+        import resource  # Unix only
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # kilobytes everywhere but macOS
+
+
+def phase(profile, name):
+    """profile.phase(name), or a block that does nothing when profile is None."""
+    return profile.phase(name) if profile is not None else contextlib.nullcontext()
+
+
+class RunProfile:
+    """Wall and CPU time per phase, sample counts and peak memory of one run.
+
+    Phases are timed with `with profile.phase(name):` blocks, which may nest; a phase is only
+    charged for the time not spent in the phases inside it, so the phase times add up to the
+    instrumented part of the run. CPU time is that of this process, so work done by a
+    sampling pool shows up as wall time of the phase waiting for it. With trace_memory the
+    peak of the Python allocations (tracemalloc) is kept per phase too; tracing slows every
+    allocation down, so it is off by default. context (e.g. graph, c and rep) is repeated
+    on every record.
+    """
+
+    def __init__(self, trace_memory=False, **context):
+        self.context = context
+        self.trace_memory = trace_memory
+        self.phases = {}  # name -> totals over all calls of the phase
+        self.samples = 0  # samples computed by the streams passed through stream()
+        self.num_ssp = {}  # node -> samples used for it, set by the caller
+        self._open = []  # [wall, cpu, traced peak] of the phases inside each open phase
+        self._traced_peak = 0
+        self._start = time.perf_counter(), time.process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            self._note_peak(tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()  # from here on the peak belongs to this phase
+        self._open.append([0.0, 0.0, 0])
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            inner_wall, inner_cpu, peak = self._open.pop()
+            stats = self.phases.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+            stats['calls'] += 1
+            stats['wall_seconds'] += wall - inner_wall
+            stats['cpu_seconds'] += cpu - inner_cpu
+            if self._open:
+                self._open[-1][0] += wall
+                self._open[-1][1] += cpu
+            if self.trace_memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                stats['traced_peak_bytes'] = max(stats.get('traced_peak_bytes', 0), peak)
+                self._note_peak(peak)
+                tracemalloc.reset_peak()
+
+    def _note_peak(self, peak):
+        if self._open:
+            self._open[-1][2] = max(self._open[-1][2], peak)
+        self._traced_peak = max(self._traced_peak, peak)
+
+    def stream(self, batches, name='sampling'):
+        """Pass a stream of dependency batches through, timing each batch as phase name and counting its samples."""
+        try:
+            while True:
+                with self.phase(name):
+                    rows = next(batches, None)
+                if rows is None:
+                    return
+                self.samples += len(rows)
+                yield rows
+        finally:
+            batches.close()
+
+    def records(self):
+        """One record per phase and a final 'run' record with the totals, as dicts."""
+        wall = time.perf_counter() - self._start[0]
+        cpu = time.process_time() - self._start[1]
+        records = [dict(self.context, record='phase', phase=name, **stats) for name, stats in self.phases.items()]
+        run = dict(self.context, record='run', wall_seconds=wall, cpu_seconds=cpu, samples=self.samples,
+                   samples_per_second=self.samples / wall if wall > 0 else 0.0, peak_rss_bytes=peak_rss_bytes())
+        if self.trace_memory:
+            self._note_peak(tracemalloc.get_traced_memory()[1])
+            run['traced_peak_bytes'] = self._traced_peak
+        run['num_ssp'] = self.num_ssp
+        records.append(run)
+        return records
+
+    def write(self, path):
+        """Append the records to the JSON lines file at path, stamped with the current time."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with open(path, 'a') as f:
+            f.writelines(json.dumps(dict(record, time=stamp)) + '\n' for record in self.records())
@@ -0,0 +1,217 @@
+import numpy as np
+
+from csr_graph import CSRGraph
+from profiling import phase
+from shortest_paths import accumulate_dependencies, shortest_path_dag
+
+
+def biconnected_blocks(graph):
+    """Split a CSRGraph into its biconnected blocks (Hopcroft-Tarjan, without recursion).
+
+    Returns a list of (nodes, src, dst, slots) arrays, one per block: the sorted node ids of the
+    block, its edges and their positions in graph.indices (for looking up weights). Bridges, and
+    so the degree-1 fringes of the graph, come out as two-node blocks. Isolated nodes belong to no block.
+    """
+    n = graph.number_of_nodes()
+    indptr, indices = graph.indptr, graph.indices
+    disc = np.full(n, -1, dtype=np.int64)
+    low = np.zeros(n, dtype=np.int64)
+    blocks = []
+    time = 0
+    for root in range(n):
+        if disc[root] >= 0 or indptr[root] == indptr[root + 1]:
+            continue
+        disc[root] = low[root] = time
+        time += 1
+        stack = [[root, -1, int(indptr[root])]]  # node, DFS parent, next neighbour slot
+        edges = []
+        while stack:
+            frame = stack[-1]
+            v, parent, i = frame
+            if i < indptr[v + 1]:
+                frame[2] += 1
+                w = int(indices[i])
+                if disc[w] < 0:
+                    edges.append((v, w, i))
+                    disc[w] = low[w] = time
+                    time += 1
+                    stack.append([w, v, int(indptr[w])])
+                elif w != parent and disc[w] < disc[v]:
+                    edges.append((v, w, i))  # back edge
+                    low[v] = min(low[v], disc[w])
+                continue
+            stack.pop()
+            if parent < 0:
+                continue
+            low[parent] = min(low[parent], low[v])
+            if low[v] >= disc[parent]:
+                # parent separates v's subtree: its edges, up to the tree edge (parent, v), form a block
+                block = []
+                while True:
+                    edge = edges.pop()
+                    block.append(edge)
+                    if edge[0] == parent and edge[1] == v:
+                        break
+                src, dst, slots = np.array(block, dtype=np.int64).T
+                blocks.append((np.unique(np.concatenate([src, dst])), src, dst, slots))
+    return blocks
+
+
+class PrunedGraph:
+    """Biconnected-block decomposition of a CSRGraph for computing dependencies block by block.
+
+    A shortest path (weighted or not) between two nodes of a block never leaves the block, and
+    every path into a block enters it at one node. So for a sampled source x and a target v, only the block B of v
+    that faces x matters: with s the node where paths from x enter B and weight[u] the number of
+    nodes that enter B at u, the Brandes dependency of x on v is
+
+        delta_x(v) = delta'_s(v) + weight[v] - 1,
+
+    where delta'_s is accumulated within B alone with each target counting weight[w] times. The
+    sampling BFS therefore only walks B instead of the whole graph, and two-node blocks (bridges,
+    including whole degree-1 fringes) need no search at all since delta' is 0 there.
+    """
+
+    def __init__(self, graph):
+        self.n = graph.number_of_nodes()
+        blocks = biconnected_blocks(graph)
+        num_blocks = len(blocks)
+        self.block_nodes = [nodes for nodes, _, _, _ in blocks]
+        self.block_edges = [(src, dst, None if graph.weights is None else graph.weights[slots])
+                            for _, src, dst, slots in blocks]
+        self._block_graphs = {}
+
+        # Nodes in more than one block are articulation points
+        membership = np.bincount(np.concatenate(self.block_nodes) if blocks else np.zeros(0, dtype=np.int64),
+                                 minlength=self.n)
+        articulation = np.flatnonzero(membership > 1)
+        self.articulation = articulation
+        self.art_index = np.full(self.n, -1, dtype=np.int64)
+        self.art_index[articulation] = np.arange(len(articulation))
+
+        # Block-cut tree: blocks are tree nodes 0..num_blocks-1, articulation point a is num_blocks + art_index[a]
+        num_tree = num_blocks + len(articulation)
+        adjacency = [[] for _ in range(num_tree)]
+        self.position = np.full(self.n, -1, dtype=np.int64)  # tree node holding each graph node
+        for b, nodes in enumerate(self.block_nodes):
+            for a in nodes[self.art_index[nodes] >= 0].tolist():
+                t = num_blocks + self.art_index[a]
+                adjacency[b].append(t)
+                adjacency[t].append(b)
+            inner = nodes[self.art_index[nodes] < 0]
+            self.position[inner] = b
+        self.position[articulation] = num_blocks + np.arange(len(articulation))
+
+        # Root every tree at a block and record DFS intervals and subtree sizes (in graph nodes)
+        self.parent = np.full(num_tree, -1, dtype=np.int64)
+        self.tin = np.zeros(num_tree, dtype=np.int64)
+        self.tout = np.zeros(num_tree, dtype=np.int64)
+        self.size = np.zeros(num_tree, dtype=np.int64)
+        self.component = np.full(num_tree, -1, dtype=np.int64)
+        own = np.array([int((self.art_index[nodes] < 0).sum()) for nodes in self.block_nodes] + [1] * len(articulation),
+                       dtype=np.int64)  # graph nodes a tree node stands for itself
+        clock = 0
+        for root in range(num_blocks):
+            if self.component[root] >= 0:
+                continue
+            self.component[root] = root
+            self.tin[root] = clock
+            clock += 1
+            stack = [(root, iter(adjacency[root]))]
+            while stack:
+                t, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    self.tout[t] = clock - 1
+                    self.size[t] += own[t]
+                    if self.parent[t] >= 0:
+                        self.size[self.parent[t]] += self.size[t]
+                elif child != self.parent[t]:
+                    self.parent[child] = t
+                    self.component[child] = root
+                    self.tin[child] = clock
+                    clock += 1
+                    stack.append((child, iter(adjacency[child])))
+        self.children = [sorted((c for c in adjacency[t] if c != self.parent[t]), key=self.tin.__getitem__)
+                         for t in range(num_tree)]
+        self.children_tin = [self.tin[c] for c in self.children]
+
+        # weight[u] of every node u of every block: the number of graph nodes entering the block at u
+        self.block_weight = []
+        for b, nodes in enumerate(self.block_nodes):
+            weight = np.ones(len(nodes))
+            for i, a in enumerate(nodes.tolist()):
+                t = self.position[a]
+                if t == b:
+                    continue
+                weight[i] = self.size[t] if self.parent[t] == b else self.size[self.component[b]] - self.size[b]
+            self.block_weight.append(weight)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_block_graphs'] = {}  # rebuilt on demand in every process
+        return state
+
+    @property
+    def largest_block(self):
+        return max((len(nodes) for nodes in self.block_nodes), default=0)
+
+    def block_graph(self, b):
+        """The CSRGraph of block b, with node ids local to the block."""
+        graph = self._block_graphs.get(b)
+        if graph is None:
+            nodes = self.block_nodes[b]
+            src, dst, weights = self.block_edges[b]
+            graph = CSRGraph.from_edges(np.searchsorted(nodes, src), np.searchsorted(nodes, dst), nodes.tolist(),
+                                        weights)
+            self._block_graphs[b] = graph
+        return graph
+
+    def _toward(self, t, p):
+        """The tree neighbour of tree node t on the way to tree node p (p != t)."""
+        if self.tin[t] < self.tin[p] <= self.tout[t]:
+            return self.children[t][np.searchsorted(self.children_tin[t], self.tin[p], side='right') - 1]
+        return self.parent[t]
+
+    def dependencies(self, x, target_ids, cache=None, profile=None):
+        """Return delta_x(v) for every target id v, as the full-graph Brandes accumulation would.
+
+        Each block is searched at most once per call; cache (a PathCache) keeps the block DAGs.
+        The searches and accumulations are timed as the 'bfs' and 'dependency' phases of profile.
+        """
+        result = np.zeros(len(target_ids))
+        p = self.position[x]
+        if p < 0:
+            return result  # isolated source
+        num_blocks = len(self.block_nodes)
+        block_deltas = {}
+        for i, v in enumerate(target_ids.tolist()):
+            t = self.position[v]
+            if v == x or t < 0 or self.component[t] != self.component[p]:
+                continue
+            b = t if t < num_blocks else self._toward(t, p)  # the block of v facing x
+            nodes = self.block_nodes[b]
+            local = np.searchsorted(nodes, v)
+            extra = self.block_weight[b][local] - 1
+            if len(nodes) == 2:
+                result[i] = extra  # a bridge: v is never in between within the block
+                continue
+            delta = block_deltas.get(b)
+            if delta is None:
+                s = int(np.searchsorted(nodes, x if p == b else self._entry(b, p)))
+                dag = cache.get((b, s)) if cache is not None else None
+                if dag is None:
+                    with phase(profile, 'bfs'):
+                        dag = shortest_path_dag(self.block_graph(b), s)
+                    if cache is not None:
+                        cache.put((b, s), dag)
+                with phase(profile, 'dependency'):
+                    delta = accumulate_dependencies(dag, self.block_weight[b])
+                block_deltas[b] = delta
+            result[i] = delta[local] + extra
+        return result
+
+    def _entry(self, b, p):
+        """The node through which paths from tree node p enter block b."""
+        return int(self.articulation[self._toward(b, p) - len(self.block_nodes)])
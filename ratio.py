@@ -1,5 +1,6 @@
 import matplotlib.pyplot as plt
 import os
+from results_store import averaged_top_nodes, select
 
 def plot_totalnodes_to_numssp_ratio(graph_name, c_list, output_folder):
     """
@@ -7,26 +8,19 @@ def plot_totalnodes_to_numssp_ratio(graph_name, c_list, output_folder):
 
     Args:
         graph_name (str): Name of the graph being analyzed.
-        dataset_file (str): Path to the dataset file containing TotalNodes and NumSSP values.
+        c_list (list): Values of c to plot, read from the results store.
     """
 
     plt.figure(figsize=(12, 6))
     x = list(range(1, 31))
 
+    # NumSSP/TotalNodes averaged over the repetitions, for the top 30 nodes of every c at once
+    averages = averaged_top_nodes([graph_name], c_list, variant='ResultsAlt3', top=30)
     for c in c_list:
-        averaged_file = os.path.join(output_folder, f'{graph_name}_averaged_results3_c{c}.txt')
-        with open(averaged_file, 'r') as f:
-            lines = f.readlines()[1:]  # Skip the header
-            for line in lines:
-                parts = line.strip().split()
-                print(parts)
-            averaged_results = {int(line.split()[0]): float(line.split()[2]) for line in lines}
-
-            top_nodes = sorted(averaged_results.keys(), reverse=True)[:30]
-            averaged_values = [averaged_results[node] for node in top_nodes]
-            print(averaged_values)
+        averaged_values = select(averages, c=c)['ssp_ratio']
+        print(averaged_values)
         
-        plt.plot(x, averaged_values, label=f'Approximated BC (c={c})', marker='o')
+        plt.plot(x[:len(averaged_values)], averaged_values, label=f'Approximated BC (c={c})', marker='o')
 
 
     plt.title(f'Ratio SSP/Totalnodes for {graph_name}')
@@ -0,0 +1,209 @@
+import glob
+import gzip
+import os
+import re
+
+import numpy as np
+
+STORE_DIR = 'ResultsStore'  # Folder holding one part file per (graph, c, repetition)
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}  # file suffix per result compression
+VARIANTS = ('Results', 'ResultsAlt2', 'ResultsAlt3')  # estimator variants, named after their old result folders
+COLUMNS = ('graph', 'c', 'rep', 'variant', 'node', 'degree', 'true_bc', 'approx_bc', 'num_ssp', 'total_nodes',
+           'ssp_ratio', 'calculation_time')
+
+
+def open_result_file(path, mode='rt'):
+    """Open a result file, decompressing .gz and .zst files on the fly."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    if path.endswith('.zst'):
+        import zstandard  # optional, only needed for zstd compressed results
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+def write_result_file(path, nodes, degree, true_bc, approx_bc, num_ssp, total_nodes, calculation_time):
+    """Write one result file in the save_results_to_file format with a single buffered write.
+
+    The error and ratio columns are computed on whole NumPy arrays and every row is formatted
+    in one pass. Paths ending in .gz or .zst are compressed with gzip or zstd.
+    """
+    true_bc = np.asarray(true_bc, dtype=np.float64)
+    approx_bc = np.asarray(approx_bc, dtype=np.float64)
+    num_ssp = np.asarray(num_ssp, dtype=np.int64)
+    error_percentage = np.divide(np.abs(true_bc - approx_bc) * 100, true_bc, out=np.zeros_like(true_bc),
+                                 where=true_bc > 0)
+    num_ssp_per_node = num_ssp / total_nodes if total_nodes > 0 else np.zeros(len(num_ssp))
+
+    row = '{}\t{}\t{!r}\t{!r}\t{:.6f}\t{}\t{:.6f}\n'.format
+    text = (f"Total Nodes: {total_nodes}\n"
+            f"Calculation Time (seconds): {calculation_time}\n\n"
+            "Node\tDegree\tTrue_BC\tApproximated_BC\tErrorPercentage\tNumSSP\tNumSSP/TotalNodes\n"
+            + ''.join(map(row, nodes, np.asarray(degree, dtype=np.int64).tolist(), true_bc.tolist(),
+                          approx_bc.tolist(), error_percentage.tolist(), num_ssp.tolist(),
+                          num_ssp_per_node.tolist())))
+
+    data = text.encode()
+    if path.endswith('.gz'):
+        data = gzip.compress(data, compresslevel=6)
+    elif path.endswith('.zst'):
+        import zstandard  # optional, only needed for zstd compressed results
+        data = zstandard.ZstdCompressor().compress(data)
+    # Write to a temporary file first so an interrupted run never leaves a partial result behind
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def written_ratio(num_ssp, total_nodes):
+    """The NumSSP/TotalNodes column as write_result_file writes it, i.e. rounded to 6 decimals."""
+    num_ssp = np.asarray(num_ssp, dtype=np.float64)
+    total_nodes = np.broadcast_to(total_nodes, num_ssp.shape)
+    ratio = np.divide(num_ssp, total_nodes, out=np.zeros_like(num_ssp), where=total_nodes > 0)
+    return np.array([float(f'{value:.6f}') for value in ratio.tolist()])
+
+
+def part_path(store, graph_name, c, rep):
+    return os.path.join(store, f"{graph_name}_c{c}_rep{rep}.npz")
+
+
+def has_part(store, graph_name, c, rep):
+    return os.path.exists(part_path(store, graph_name, c, rep))
+
+
+def write_part(store, graph_name, c, rep, nodes, degree, true_bc, approx_bcs, num_ssp, total_nodes, calculation_time,
+               ssp_ratio=None):
+    """Store the results of one repetition as columns, one row per (variant, node).
+
+    approx_bcs holds one array of estimates per entry of VARIANTS, aligned with nodes.
+    ssp_ratio is the NumSSP/TotalNodes column of the result files, by default as
+    write_result_file writes it.
+    """
+    if ssp_ratio is None:
+        ssp_ratio = written_ratio(num_ssp, total_nodes)
+    rows = len(nodes) * len(VARIANTS)
+    columns = {
+        'graph': np.full(rows, graph_name),
+        'c': np.full(rows, c),
+        'rep': np.full(rows, rep),
+        'variant': np.repeat(VARIANTS, len(nodes)),
+        'node': np.tile(np.asarray(nodes, dtype=str), len(VARIANTS)),
+        'degree': np.tile(np.asarray(degree, dtype=np.int64), len(VARIANTS)),
+        'true_bc': np.tile(np.asarray(true_bc, dtype=np.float64), len(VARIANTS)),
+        'approx_bc': np.concatenate([np.asarray(approx, dtype=np.float64) for approx in approx_bcs]),
+        'num_ssp': np.tile(np.asarray(num_ssp, dtype=np.int64), len(VARIANTS)),
+        'total_nodes': np.full(rows, total_nodes),
+        'ssp_ratio': np.tile(np.asarray(ssp_ratio, dtype=np.float64), len(VARIANTS)),
+        'calculation_time': np.full(rows, calculation_time),
+    }
+    os.makedirs(store, exist_ok=True)
+    path = part_path(store, graph_name, c, rep)
+    np.savez(path + '.tmp.npz', **columns)
+    os.replace(path + '.tmp.npz', path)  # a part is either complete or absent
+
+
+def select(table, **filters):
+    """Rows of a table (dict of equal-length columns) whose columns match the filters.
+
+    Each filter is a single value or a list of accepted values.
+    """
+    keep = np.ones(len(table['graph']), dtype=bool)
+    for column, accepted in filters.items():
+        keep &= np.isin(table[column], accepted)
+    return {column: values[keep] for column, values in table.items()}
+
+
+def load_results(store=STORE_DIR, **filters):
+    """Load every part of the store into one table, keeping the rows that match the filters."""
+    parts = []
+    for path in sorted(glob.glob(os.path.join(store, '*.npz'))):
+        with np.load(path) as part:
+            columns = {column: part[column] for column in COLUMNS if column in part.files}
+        if 'ssp_ratio' not in columns:  # parts stored before the column existed
+            columns['ssp_ratio'] = written_ratio(columns['num_ssp'], columns['total_nodes'])
+        parts.append(columns)
+    if not parts:
+        return {column: np.zeros(0) for column in COLUMNS}
+    table = {column: np.concatenate([part[column] for part in parts]) for column in COLUMNS}
+    return select(table, **filters) if filters else table
+
+
+def group_codes(table, keys):
+    """Integer group number of every row for the given key columns, plus the first row of each group."""
+    inverses, sizes = [], []
+    for key in keys:
+        unique, inverse = np.unique(table[key], return_inverse=True)
+        inverses.append(inverse)
+        sizes.append(len(unique))
+    codes = np.ravel_multi_index(inverses, sizes)
+    _, first, groups = np.unique(codes, return_index=True, return_inverse=True)
+    return groups, first
+
+
+def group_mean(table, keys, values):
+    """Mean of the value columns per distinct combination of the key columns.
+
+    The result is a table with the key columns, one column per value and a 'count' column.
+    """
+    groups, first = group_codes(table, keys)
+    counts = np.bincount(groups, minlength=len(first))
+    result = {key: table[key][first] for key in keys}
+    for value in values:
+        result[value] = np.bincount(groups, weights=table[value], minlength=len(first)) / counts
+    result['count'] = counts
+    return result
+
+
+def top_k_per_group(table, keys, by, k):
+    """The k rows with the largest `by` within each group of the key columns, largest first."""
+    groups, first = group_codes(table, keys)
+    order = np.lexsort((-table[by], groups))  # stable, so ties keep their table order
+    starts = np.searchsorted(groups[order], np.arange(len(first)))
+    rank = np.arange(len(order)) - starts[groups[order]]
+    keep = order[rank < k]
+    return {column: values[keep] for column, values in table.items()}
+
+
+def averaged_top_nodes(graph_names, c_list, variant='ResultsAlt3', top=30, store=STORE_DIR):
+    """Per graph and c, the repetition averages of the `top` nodes with the highest true BC.
+
+    ssp_ratio is the NumSSP/TotalNodes column of the result files, the sample count as a
+    fraction of the graph size, averaged as written like the original Averaging.py did.
+    """
+    results = load_results(store, graph=graph_names, c=c_list, variant=variant)
+    averages = group_mean(results, ('graph', 'c', 'node'), ('true_bc', 'approx_bc', 'ssp_ratio'))
+    return top_k_per_group(averages, ('graph', 'c'), 'true_bc', top)
+
+
+def import_result_files(results_folder='Results2', store=STORE_DIR, top=30):
+    """Convert the per-repetition text files written by save_results_to_file into store parts.
+
+    Like the parts run_task writes, only the `top` nodes with the highest true BC (the ones
+    that were estimated) are kept. Repetitions that already have a part are left alone.
+    """
+    pattern = re.compile(r'(.+)_results_c(\d+)_rep(\d+)\.txt(\.gz|\.zst)?$')
+    tasks = {}
+    for path in glob.glob(os.path.join(results_folder, f'{VARIANTS[0]}_c*', '*.txt*')):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            tasks[(match.group(1), int(match.group(2)), int(match.group(3)))] = os.path.basename(path)
+
+    imported = 0
+    for (graph_name, c, rep), file_name in sorted(tasks.items()):
+        paths = [os.path.join(results_folder, f'{variant}_c{c}', file_name) for variant in VARIANTS]
+        if has_part(store, graph_name, c, rep) or not all(os.path.exists(path) for path in paths):
+            continue
+        tables = []
+        for path in paths:
+            with open_result_file(path) as f:
+                total_nodes = int(f.readline().split(':')[1])
+                calculation_time = float(f.readline().split(':')[1])
+                tables.append(np.loadtxt(f, dtype=str, skiprows=2, ndmin=2))
+        keep = np.argsort(-tables[0][:, 2].astype(np.float64), kind='stable')[:top]
+        tables = [table[keep] for table in tables]  # every variant file lists the nodes in the same order
+        first = tables[0]
+        write_part(store, graph_name, c, rep, first[:, 0], first[:, 1].astype(np.int64),
+                   first[:, 2].astype(np.float64), [table[:, 3].astype(np.float64) for table in tables],
+                   first[:, 5].astype(np.int64), total_nodes, calculation_time, first[:, 6].astype(np.float64))
+        imported += 1
+    print(f"Imported {imported} repetitions from {results_folder} into {store}")
@@ -0,0 +1,345 @@
+import heapq
+
+import numpy as np
+
+BACKENDS = ('msbfs', 'sparse', 'bfs')  # engines of batch_dependencies
+
+
+class ShortestPathDAG:
+    """Shortest-path DAG rooted at a single source, stored in flat arrays.
+
+    The reachable nodes are grouped in levels of equal distance from the source: hop counts for
+    bfs_dag, distinct path lengths (in increasing order) for dijkstra_dag. dist[v] is the level
+    of v (-1 if v is unreachable) and sigma[v] the number of shortest paths from the source to v.
+    order holds the reachable nodes level by level, so order[::-1] is the reverse order used for
+    dependency accumulation. The nodes of level d are order[level_ptr[d]:level_ptr[d + 1]].
+
+    The DAG edges are stored as two parallel arrays: pred_src[i] is a predecessor of
+    pred_dst[i] on a shortest path. The edges into the nodes at distance d are the slice
+    edge_ptr[d]:edge_ptr[d + 1]. For dijkstra_dag lengths[d] is the path length of level d;
+    it is None for bfs_dag, where that is d itself.
+    """
+
+    __slots__ = ('source', 'dist', 'sigma', 'order', 'level_ptr', 'pred_src', 'pred_dst', 'edge_ptr', 'lengths')
+
+    def __init__(self, source, dist, sigma, order, level_ptr, pred_src, pred_dst, edge_ptr, lengths=None):
+        self.source = source
+        self.dist = dist
+        self.sigma = sigma
+        self.order = order
+        self.level_ptr = level_ptr
+        self.pred_src = pred_src
+        self.pred_dst = pred_dst
+        self.edge_ptr = edge_ptr
+        self.lengths = lengths
+
+    @property
+    def num_levels(self):
+        return len(self.level_ptr) - 1
+
+    @property
+    def nbytes(self):
+        """Memory held by the DAG arrays."""
+        return sum(getattr(self, name).nbytes for name in self.__slots__[1:] if getattr(self, name) is not None)
+
+    def predecessors(self, v):
+        """Return the predecessors of node v on shortest paths from the source."""
+        d = self.dist[v]
+        if d <= 0:
+            return self.pred_src[:0]
+        start, end = self.edge_ptr[d], self.edge_ptr[d + 1]
+        return self.pred_src[start:end][self.pred_dst[start:end] == v]
+
+    def through_mask(self, v):
+        """Boolean mask of the targets t for which v lies on a shortest path from the source to t.
+
+        This includes v itself and, when v is the source, every reachable node.
+        """
+        mask = np.zeros(len(self.dist), dtype=bool)
+        d = self.dist[v]
+        if d < 0:
+            return mask
+        mask[v] = True
+        for level in range(d + 1, self.num_levels):
+            start, end = self.edge_ptr[level], self.edge_ptr[level + 1]
+            hit = mask[self.pred_src[start:end]]
+            mask[self.pred_dst[start:end][hit]] = True
+        return mask
+
+
+def bfs_dag(graph, s):
+    """Build the shortest-path DAG from source s with a single breadth-first search.
+
+    graph is a CSRGraph. The search advances one whole level at a time with vectorised
+    NumPy operations, accumulating path counts as it goes, so one call costs O(n + m).
+    """
+    n = graph.number_of_nodes()
+    dist = np.full(n, -1, dtype=np.int32)
+    sigma = np.zeros(n, dtype=np.float64)
+    dist[s] = 0
+    sigma[s] = 1
+
+    frontier = np.array([s], dtype=np.int32)
+    levels = [frontier]
+    src_levels = []
+    dst_levels = []
+    d = 0
+    while True:
+        src, dst = graph.gather_neighbors(frontier)
+        fresh = dist[dst] < 0  # edges into the next level; earlier levels are already labelled
+        src, dst = src[fresh], dst[fresh]
+        if len(dst) == 0:
+            break
+        d += 1
+
+        # Group the DAG edges by their head so the next level comes out sorted and unique
+        perm = np.argsort(dst, kind='stable')
+        src, dst = src[perm].astype(np.int32), dst[perm]
+        starts = np.flatnonzero(np.concatenate(([True], dst[1:] != dst[:-1])))
+        frontier = dst[starts]
+        dist[frontier] = d
+        sigma[frontier] = np.add.reduceat(sigma[src], starts)
+
+        levels.append(frontier)
+        src_levels.append(src)
+        dst_levels.append(dst)
+
+    level_ptr = np.zeros(len(levels) + 1, dtype=np.int64)
+    np.cumsum([len(level) for level in levels], out=level_ptr[1:])
+    edge_ptr = np.zeros(len(levels) + 1, dtype=np.int64)
+    np.cumsum([len(edges) for edges in src_levels], out=edge_ptr[2:])
+
+    empty = np.zeros(0, dtype=np.int32)
+    return ShortestPathDAG(
+        s,
+        dist,
+        sigma,
+        np.concatenate(levels),
+        level_ptr,
+        np.concatenate(src_levels) if src_levels else empty,
+        np.concatenate(dst_levels) if dst_levels else empty,
+        edge_ptr,
+    )
+
+
+def dijkstra_dag(graph, s):
+    """Build the shortest-path DAG from source s of a weighted CSRGraph with Dijkstra's algorithm.
+
+    A binary heap orders the nodes by path length; path counts are complete once a node is
+    settled since all edge weights are positive. Path lengths are compared exactly, like
+    nx.betweenness_centrality(weight=...) does. The result has the same layout as bfs_dag's.
+    """
+    n = graph.number_of_nodes()
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+    weights = graph.weights.tolist()
+    length = [float('inf')] * n
+    sigma = [0.0] * n
+    preds = [None] * n
+    settled = [False] * n
+    length[s] = 0.0
+    sigma[s] = 1.0
+    preds[s] = []
+
+    order = []
+    heap = [(0.0, s)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if settled[v]:
+            continue  # stale heap entry
+        settled[v] = True
+        order.append(v)
+        for j in range(indptr[v], indptr[v + 1]):
+            w = indices[j]
+            candidate = d + weights[j]
+            if candidate < length[w]:
+                length[w] = candidate
+                sigma[w] = sigma[v]
+                preds[w] = [v]
+                heapq.heappush(heap, (candidate, w))
+            elif candidate == length[w] and not settled[w]:
+                sigma[w] += sigma[v]
+                preds[w].append(v)
+
+    # Nodes are settled in order of length, so equal lengths are adjacent and form the levels
+    lengths = np.array([length[v] for v in order])
+    level_of = np.concatenate(([0], np.cumsum(lengths[1:] != lengths[:-1]))).astype(np.int32)
+    dist = np.full(n, -1, dtype=np.int32)
+    dist[order] = level_of
+    num_levels = int(level_of[-1]) + 1
+    level_ptr = np.zeros(num_levels + 1, dtype=np.int64)
+    np.cumsum(np.bincount(level_of, minlength=num_levels), out=level_ptr[1:])
+
+    pred_src = np.array([u for v in order for u in preds[v]], dtype=np.int32)
+    pred_dst = np.array([v for v in order for _ in preds[v]], dtype=np.int32)
+    edge_ptr = np.zeros(num_levels + 1, dtype=np.int64)
+    np.cumsum(np.bincount(dist[pred_dst], minlength=num_levels), out=edge_ptr[1:])
+    return ShortestPathDAG(s, dist, np.array(sigma), np.array(order, dtype=np.int32), level_ptr,
+                           pred_src, pred_dst, edge_ptr, lengths[level_ptr[:-1]])
+
+
+def shortest_path_dag(graph, s):
+    """The shortest-path DAG from s: Dijkstra's algorithm for weighted graphs, BFS otherwise."""
+    if graph.weighted:
+        return dijkstra_dag(graph, s)
+    return bfs_dag(graph, s)
+
+
+def accumulate_dependencies(dag, weight=None):
+    """Return the dependency delta_s(v) of the DAG's source s on every node v.
+
+    Brandes' back-propagation without recursion: the levels are swept deepest first and
+    every DAG edge u -> w adds sigma[u] / sigma[w] * (weight[w] + delta[w]) to delta[u]. weight[w]
+    is the number of targets node w stands for (1 for every node by default). The source's
+    own entry is left at 0 since it is an endpoint of all its paths.
+    """
+    delta = np.zeros(len(dag.dist))
+    for level in range(dag.num_levels - 1, 0, -1):
+        start, end = dag.edge_ptr[level], dag.edge_ptr[level + 1]
+        u, w = dag.pred_src[start:end], dag.pred_dst[start:end]
+        targets = 1 if weight is None else weight[w]
+        np.add.at(delta, u, dag.sigma[u] / dag.sigma[w] * (targets + delta[w]))
+    delta[dag.source] = 0
+    return delta
+
+
+
+class MultiSourceDAG:
+    """Shortest-path DAGs of k sources of an unweighted graph, built together by multi_source_bfs.
+
+    Column j of the (n x k) arrays dist and sigma belongs to sources[j], with the meaning they
+    have in ShortestPathDAG. The DAG edges of all sources are stored as flat slot numbers
+    v * k + j (node v in the DAG of sources[j]): pred_src[i] is a predecessor of pred_dst[i],
+    and the edges into level d are the slice edge_ptr[d]:edge_ptr[d + 1].
+    """
+
+    __slots__ = ('sources', 'dist', 'sigma', 'pred_src', 'pred_dst', 'edge_ptr')
+
+    def __init__(self, sources, dist, sigma, pred_src, pred_dst, edge_ptr):
+        self.sources = sources
+        self.dist = dist
+        self.sigma = sigma
+        self.pred_src = pred_src
+        self.pred_dst = pred_dst
+        self.edge_ptr = edge_ptr
+
+    @property
+    def num_levels(self):
+        return len(self.edge_ptr) - 1
+
+
+def _unpack(bits):
+    """Boolean matrix of every bit of every row of a uint64 bitset matrix, bit j of a row in column j."""
+    return np.unpackbits(bits.astype('<u8', copy=False).view(np.uint8), axis=1, bitorder='little').view(bool)
+
+
+def multi_source_bfs(graph, sources):
+    """Breadth-first searches from many sources of an unweighted CSRGraph in one sweep (MS-BFS).
+
+    Every node keeps its frontier and visited sets as bitsets, one bit per source packed in
+    uint64 words, so each level is a single pass over the edges of the nodes that are in the
+    frontier of any source instead of one pass per source: a word-parallel AND-NOT finds,
+    for 64 sources at a time, the edges that lead to the next level. Only those (edge, source)
+    pairs are expanded to update the path counts, so the arithmetic matches k separate
+    searches while the number of NumPy calls is that of one. Returns a MultiSourceDAG.
+    """
+    n = graph.number_of_nodes()
+    sources = np.asarray(sources, dtype=np.int64)
+    k = len(sources)
+    columns = np.arange(k)
+    dist = np.full(n * k, -1, dtype=np.int32)  # flat (n x k) arrays, indexed by slot v * k + j
+    sigma = np.zeros(n * k)
+    dist[sources * k + columns] = 0
+    sigma[sources * k + columns] = 1
+
+    # Bit j of row v: v is in the frontier of sources[j]. The rows are padded to a power of two
+    # words, so a flat bit index splits into (edge, column) with a shift and a mask.
+    words = 1 << (-(-k // 64) - 1).bit_length()
+    shift = (64 * words).bit_length() - 1
+    frontier = np.zeros((n, words), dtype=np.uint64)
+    np.bitwise_or.at(frontier, (sources, columns // 64), np.left_shift(np.uint64(1), (columns % 64).astype(np.uint64)))
+    visited = frontier.copy()
+    active = np.unique(sources)
+    src_levels = []
+    dst_levels = []
+    while len(active) > 0:
+        src, dst = graph.gather_neighbors(active)
+        bits = frontier[src] & ~visited[dst]  # the sources for which the edge leads to the next level
+        frontier[active] = 0
+        hit = bits.any(axis=1)
+        src, dst, bits = src[hit], dst[hit], bits[hit]
+        if len(dst) == 0:
+            break
+
+        # OR the bits of every edge into the frontier of its head
+        np.bitwise_or.at(frontier, dst, bits)
+        active = np.flatnonzero(frontier.any(axis=1))
+        visited[active] |= frontier[active]
+
+        edge_bits = np.flatnonzero(_unpack(bits))
+        edge, column = edge_bits >> shift, edge_bits & ((1 << shift) - 1)
+        tail = src[edge] * k + column
+        head = dst[edge] * k + column
+        np.add.at(sigma, head, sigma[tail])
+        dist[head] = len(src_levels) + 1
+        src_levels.append(tail)
+        dst_levels.append(head)
+
+    edge_ptr = np.zeros(len(src_levels) + 2, dtype=np.int64)
+    np.cumsum([len(edges) for edges in src_levels], out=edge_ptr[2:])
+    empty = np.zeros(0, dtype=np.int64)
+    return MultiSourceDAG(sources, dist.reshape(n, k), sigma.reshape(n, k),
+                          np.concatenate(src_levels) if src_levels else empty,
+                          np.concatenate(dst_levels) if dst_levels else empty, edge_ptr)
+
+
+def accumulate_multi_source(dag):
+    """Brandes dependencies of every source of a MultiSourceDAG, as an (n x k) array.
+
+    accumulate_dependencies for all sources at once: each level is swept once for all of them.
+    """
+    n, k = dag.dist.shape
+    sigma = dag.sigma.reshape(-1)
+    delta = np.zeros(n * k)
+    for level in range(dag.num_levels - 1, 0, -1):
+        start, end = dag.edge_ptr[level], dag.edge_ptr[level + 1]
+        u, w = dag.pred_src[start:end], dag.pred_dst[start:end]
+        np.add.at(delta, u, sigma[u] / sigma[w] * (1 + delta[w]))
+    delta[dag.sources * k + np.arange(k)] = 0
+    return delta.reshape(n, k)
+
+
+def batch_dependencies(graph, sources, width=64, backend='msbfs'):
+    """Dependencies of each of the sources on every node, one row per source.
+
+    backend picks the engine for unweighted graphs: 'msbfs' runs multi_source_bfs over groups
+    of width sources, 'sparse' the SciPy sparse-matrix engine of sparse_bc on the same groups
+    and 'bfs' one search per source. Weighted graphs always get one Dijkstra search per source.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    sources = np.asarray(sources, dtype=np.int64)
+    rows = np.empty((len(sources), graph.number_of_nodes()))
+    if graph.weighted or backend == 'bfs':
+        for i, s in enumerate(sources.tolist()):
+            rows[i] = accumulate_dependencies(shortest_path_dag(graph, s))
+        return rows
+    if backend == 'sparse':
+        from sparse_bc import adjacency_matrix, sparse_dependencies  # optional, needs SciPy
+        adjacency = adjacency_matrix(graph)
+        engine = lambda group: sparse_dependencies(graph, group, adjacency)
+    else:
+        engine = lambda group: accumulate_multi_source(multi_source_bfs(graph, group)).T
+    for start in range(0, len(sources), width):
+        group = sources[start:start + width]
+        rows[start:start + len(group)] = engine(group)
+    return rows
+
+
+def sum_dependencies(graph, sources, width=64, backend='msbfs'):
+    """Sum of the dependency vectors of the sources, computed width sources at a time."""
+    total = np.zeros(graph.number_of_nodes())
+    sources = np.asarray(sources, dtype=np.int64)
+    for start in range(0, len(sources), width):
+        total += batch_dependencies(graph, sources[start:start + width], width, backend).sum(axis=0)
+    return total
@@ -0,0 +1,129 @@
+import numpy as np
+
+SAMPLERS = ('uniform', 'degree', 'distance', 'component', 'degree-strata')
+
+
+class AliasTable:
+    """Walker's alias method: O(n) to build, then O(1) per draw from a fixed distribution over 0..n-1."""
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        scaled = (weights * (n / weights.sum())).tolist()  # mean 1
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        # Vose: every column is topped up to 1 by one large entry; leftovers keep prob 1 (rounding)
+        while small and large:
+            s, l = small.pop(), large[-1]
+            prob[s], alias[s] = scaled[s], l
+            scaled[l] -= 1 - scaled[s]
+            if scaled[l] < 1:
+                small.append(large.pop())
+        self.prob = np.array(prob)
+        self.alias = np.array(alias, dtype=np.int64)
+
+    def draw(self, rng, size):
+        column = rng.integers(len(self.prob), size=size)
+        return np.where(rng.random(size) < self.prob[column], column, self.alias[column])
+
+
+class UniformSampler:
+    """Every node is a source with probability 1/n; the stream every sampler is measured against."""
+
+    def __init__(self, n):
+        self.n = n
+
+    def draw(self, rng, size):
+        """Return size sources and the weight of each sample (None when every weight is 1)."""
+        return rng.integers(self.n, size=size), None
+
+
+class ImportanceSampler:
+    """Sources drawn with probability p(s) proportional to weights, from an alias table.
+
+    A sample of source s is weighted by 1 / (n p(s)), so the weighted dependencies have the same
+    mean as under uniform sampling and the estimators stay unbiased, provided every source
+    with weight 0 has no dependency on the nodes being estimated.
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        self.table = AliasTable(weights)
+        with np.errstate(divide='ignore'):
+            self.reweight = weights.sum() / (len(weights) * weights)  # never drawn where the weight is 0
+
+    def draw(self, rng, size):
+        sources = self.table.draw(rng, size)
+        return sources, self.reweight[sources]
+
+
+class StratifiedSampler:
+    """Sources drawn stratum by stratum, every stratum getting its share of each batch.
+
+    A batch of size b takes b |h| / n sources from stratum h, uniformly within it; the
+    fractions are rounded systematically with one random offset, so the counts add up to b
+    and are right on average. Every node is still drawn with probability 1/n per sample, so
+    no reweighting is needed, but a batch can no longer miss a whole stratum. The batch is
+    shuffled, so the samples a stopping rule takes from its start are still representative.
+    """
+
+    def __init__(self, strata):
+        strata = np.asarray(strata)
+        self.order = np.argsort(strata, kind='stable')  # node ids grouped by stratum
+        _, self.size = np.unique(strata[self.order], return_counts=True)
+        self.start = np.cumsum(self.size) - self.size
+        self.share = self.size / len(strata)
+
+    def draw(self, rng, size):
+        bounds = np.floor(np.concatenate([[0], np.cumsum(self.share[:-1] * size), [size]]) + rng.random())
+        stratum = np.repeat(np.arange(len(self.size)), np.diff(bounds).astype(np.int64))
+        sources = self.order[self.start[stratum] + rng.integers(self.size[stratum])]
+        rng.shuffle(sources)
+        return sources, None
+
+
+def degree_buckets(graph):
+    """Stratum of every node by degree: 0 for isolated nodes, then 1 + floor(log2(degree))."""
+    degrees = graph.degrees()
+    return np.where(degrees > 0, np.floor(np.log2(np.maximum(degrees, 1))).astype(np.int64) + 1, 0)
+
+
+def distance_to(graph, target_ids):
+    """Hop distance from every node to the nearest of the targets (-1 if it reaches none)."""
+    dist = np.full(graph.number_of_nodes(), -1, dtype=np.int64)
+    frontier = np.unique(np.asarray(target_ids, dtype=np.int64))
+    level = 0
+    while len(frontier) > 0:  # one BFS started from all targets at once
+        dist[frontier] = level
+        _, dst = graph.gather_neighbors(frontier)
+        frontier = np.unique(dst[dist[dst] < 0])
+        level += 1
+    return dist
+
+
+def make_sampler(graph, strategy='uniform', target_ids=None):
+    """The source sampler for a strategy of SAMPLERS.
+
+    'degree' draws sources proportionally to their degree and 'distance' proportionally to
+    1 / (1 + d), d being the hop distance to the nearest target (every node if target_ids is
+    None), so sources near the targets are drawn more often. Both reweight their samples.
+    Isolated nodes, and for 'distance' the nodes that cannot reach any target, are never drawn:
+    they have no dependency on the targets. 'component' and 'degree-strata' stratify the
+    uniform draw by connected component and by degree_buckets.
+    """
+    n = graph.number_of_nodes()
+    if strategy == 'uniform':
+        return UniformSampler(n)
+    if strategy == 'degree':
+        return ImportanceSampler(graph.degrees())
+    if strategy == 'distance':
+        targets = np.arange(n) if target_ids is None else target_ids
+        dist = distance_to(graph, targets)
+        return ImportanceSampler(np.where(dist >= 0, 1 / (1 + np.maximum(dist, 0)), 0))
+    if strategy == 'component':
+        return StratifiedSampler(graph.components())
+    if strategy == 'degree-strata':
+        return StratifiedSampler(degree_buckets(graph))
+    raise ValueError(f"Unknown sampler {strategy!r}, expected one of {SAMPLERS}")
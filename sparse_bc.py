@@ -0,0 +1,58 @@
+import numpy as np
+import scipy.sparse
+
+
+def adjacency_matrix(graph):
+    """The adjacency matrix of an unweighted CSRGraph as a SciPy CSR array, sharing its index arrays."""
+    n = graph.number_of_nodes()
+    return scipy.sparse.csr_array((np.ones(len(graph.indices)), graph.indices, graph.indptr), shape=(n, n))
+
+
+def sparse_dependencies(graph, sources, adjacency=None):
+    """Brandes dependencies of a block of sources with sparse matrix products, one row per source.
+
+    Column j of the (n x k) matrices belongs to sources[j]. Going down, the path counts
+    reaching the next level are A @ F, where F is a sparse matrix holding the path counts of
+    the current frontier; the entries that are reached for the first time form the next
+    frontier. Going back up, level d sends (1 + delta) / sigma of its entries to their
+    neighbours with one more product, and the entries one level up add what they receive
+    times their own sigma. Every level is one sparse x sparse product per direction, whatever
+    the number of sources. adjacency is the graph's adjacency_matrix, if the caller keeps one.
+    """
+    if graph.weighted:
+        raise ValueError("The sparse engine counts hops; use Dijkstra for weighted graphs")
+    A = adjacency_matrix(graph) if adjacency is None else adjacency
+    n = graph.number_of_nodes()
+    sources = np.asarray(sources, dtype=np.int64)
+    k = len(sources)
+    columns = np.arange(k)
+    dist = np.full(n * k, -1, dtype=np.int32)  # flat (n x k) arrays, indexed by slot v * k + j
+    sigma = np.zeros(n * k)
+    dist[sources * k + columns] = 0
+    sigma[sources * k + columns] = 1
+
+    frontier = scipy.sparse.csr_array((np.ones(k), (sources, columns)), shape=(n, k))
+    levels = [sources * k + columns]  # the slots of every level
+    while True:
+        reached = (A @ frontier).tocoo()
+        slots = reached.row.astype(np.int64) * k + reached.col
+        new = dist[slots] < 0
+        if not new.any():
+            break
+        slots, counts = slots[new], reached.data[new]
+        dist[slots] = len(levels)
+        sigma[slots] = counts
+        levels.append(slots)
+        frontier = scipy.sparse.csr_array((counts, (slots // k, slots % k)), shape=(n, k))
+
+    delta = np.zeros(n * k)
+    for d in range(len(levels) - 1, 0, -1):
+        slots = levels[d]
+        sent = scipy.sparse.csr_array(((1 + delta[slots]) / sigma[slots], (slots // k, slots % k)), shape=(n, k))
+        received = (A @ sent).tocoo()
+        targets = received.row.astype(np.int64) * k + received.col
+        above = dist[targets] == d - 1
+        targets = targets[above]
+        delta[targets] += sigma[targets] * received.data[above]
+    delta[sources * k + columns] = 0  # every source's own entry
+    return delta.reshape(n, k).T
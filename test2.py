@@ -1,73 +1,62 @@
-import networkx as nx
 import os
 import random
 import time
 
+from csr_graph import CSRGraph
+from graph_cache import load_graph
+from path_cache import PathCache
+from results_store import COMPRESSION_SUFFIXES, write_result_file
+from shortest_paths import shortest_path_dag
+from true_bc import WEIGHTED_SUFFIX, true_bc_path
+
 class GraphCentralityCalculator:
-    def __init__(self, graph, graph_name):
-        self.G = graph
+    def __init__(self, graph, graph_name, cache_bytes=256 * 2**20, cache_policy='lru'):
+        # All traversals run on a compact CSR copy of the graph
+        self.graph = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
         self.graph_name = graph_name  # Save the graph name
-        self.node_list = self.G.nodes
-        self.shortest_paths = {node: {other_node: [] for other_node in self.node_list} for node in self.node_list}
+        self.node_list = self.graph.labels
+        self.node_index = self.graph.label_to_id  # node label -> integer id
+        self.shortest_paths = PathCache(cache_bytes, cache_policy)  # shortest-path DAGs of recently sampled sources
         self.betweenness = {node: 0 for node in self.node_list}
-        self.degrees = {node: self.G.degree(node) for node in self.node_list}  # Calculate degrees of nodes
+        self.degrees = dict(zip(self.node_list, self.graph.degrees().tolist()))  # Calculate degrees of nodes
+
+    def save_results_to_file(self, true_bc, approx_bc, num_SSP_dict, output_folder, file_name, calculation_time,
+                             nodes=None, compression=None):
+        """Save all results to a single file in the specified format.
 
-    def save_results_to_file(self, true_bc, approx_bc, num_SSP_dict, output_folder, file_name, calculation_time):
-        """Save all results to a single file in the specified format."""
+        nodes limits the file to those nodes (all nodes with a true BC by default), e.g. the
+        ones that were estimated. compression is None, 'gzip' or 'zstd'.
+        """
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
 
-        total_nodes = len(self.G.nodes)
-
-        file_path = os.path.join(output_folder, f"{self.graph_name}_{file_name}")
-        with open(file_path, 'w') as f:
-            # Write the header
-            f.write(f"Total Nodes: {total_nodes}\n")
-            f.write(f"Calculation Time (seconds): {calculation_time}\n\n")
-            f.write("Node\tDegree\tTrue_BC\tApproximated_BC\tErrorPercentage\tNumSSP\tNumSSP/TotalNodes\n")
-
-            # Write the data for each node
-            for node in true_bc:
-                degree = self.degrees.get(node, 0)  # Get the degree of the node
-                true_bc_value = true_bc[node]
-                approx_bc_value = approx_bc.get(node, 0)  # Get the approximated BC value
-                error_percentage = (abs(true_bc_value - approx_bc_value) / true_bc_value) * 100 if true_bc_value > 0 else 0
-                num_SSP = num_SSP_dict.get(node, 0)  # Get the number of SSP calculations for the node
-                num_SSP_per_node = num_SSP / total_nodes if total_nodes > 0 else 0
-
-                f.write(f"{node}\t{degree}\t{true_bc_value}\t{approx_bc_value}\t{error_percentage:.6f}\t{num_SSP}\t{num_SSP_per_node:.6f}\n")
+        if nodes is None:
+            nodes = list(true_bc)
+        file_path = os.path.join(output_folder, f"{self.graph_name}_{file_name}{COMPRESSION_SUFFIXES[compression]}")
+        write_result_file(file_path, nodes,
+                          [self.degrees.get(node, 0) for node in nodes],
+                          [true_bc[node] for node in nodes],
+                          [approx_bc.get(node, 0) for node in nodes],
+                          [num_SSP_dict.get(node, 0) for node in nodes],
+                          self.graph.number_of_nodes(), calculation_time)
 
         print(f"Results saved to {file_path}")
 
     def shortest_path_calculation(self, s):
-        for node in self.node_list:
-            if len(self.shortest_paths[s][node]) == 0:  # Only calculate if the shortest path is empty
-                if nx.has_path(self.G, node, s):  # Check if a path exists
-                    new_path = nx.shortest_path(self.G, source=node, target=s)  # Get the shortest path from node to s
-                    self.shortest_paths[s][node] = new_path
-
-                    # Propagate the reverse shortest path as well (i.e., from node to s)
-                    self.shortest_paths[node][s] = new_path[::-1]  # Reverse the path from s to node
-
-                    # Automatically propagate shortest paths to other nodes
-                    for i in range(len(new_path) - 1):
-                        u = new_path[i]
-                        v = new_path[i + 1]
-                        if len(self.shortest_paths[u][v]) == 0:  # If we haven't already added the path
-                            self.shortest_paths[u][v] = [u, v]
-                            self.shortest_paths[v][u] = [v, u]  # Also store the reverse path
-                else:
-                    # No path exists between node and s, mark it as empty or some placeholder
-                    self.shortest_paths[s][node] = []
-                    self.shortest_paths[node][s] = []
+        """Return the shortest-path DAG from s (BFS, or Dijkstra on weighted graphs) unless s is cached."""
+        dag = self.shortest_paths.get(s)
+        if dag is None:  # Only calculate if s isn't in the cache
+            dag = shortest_path_dag(self.graph, self.node_index[s])
+            self.shortest_paths.put(s, dag)
+        return dag
 
     def approximate_BC(self, c):
-        n = self.G.number_of_nodes()
+        n = self.graph.number_of_nodes()
         num_SSP_dict = {node: 0 for node in self.node_list}  # Track num_SSP for each node
 
         for v in self.node_list:
             print(f'Looking at node {v} out of {n}')
-            Degree = self.G.degree(v)
+            Degree = self.degrees[v]
             if Degree == 0 or Degree == 1:  # if the degree of v is 0 or 1 then the BC is automatically 0
                 self.betweenness[v] = 0
             else:
@@ -77,20 +66,13 @@ class GraphCentralityCalculator:
                 start_time = time.time()  # Track the start time of the calculations
 
                 while S < c * n:
-                    s = random.choice(list(self.G.nodes))  # sample a random node
+                    s = random.choice(self.node_list)  # sample a random node
                     k += 1  # Increment the number of samples
-                    self.shortest_path_calculation(s)  # calculate all shortest paths from s to all other nodes
+                    dag = self.shortest_path_calculation(s)  # one BFS gives all shortest paths from s
                     num_SSP_dict[v] += 1  # increase number of SSP calcs done for this specific node
-                    predecessors = {node: set() for node in self.node_list}  # add all predecessors from the paths from s
-                    for target, path in self.shortest_paths[s].items():
-                        for i in range(1, len(path)):  # Skip the source vertex
-                            predecessors[path[i]].add(path[i-1])  # Add the predecessor to the set
-                    total_dependency = 0
-                    for target, path in self.shortest_paths[s].items():
-                        if target == s:  # Skip the source vertex
-                            continue
-                        if v in path:
-                            total_dependency += 1
+                    through_v = dag.through_mask(self.node_index[v])  # targets with v on a shortest path from s
+                    through_v[self.node_index[s]] = False  # Skip the source vertex
+                    total_dependency = int(through_v.sum())
                     S += total_dependency
                 # used to be = n * S / k
                 self.betweenness[v] = S / (k * (n - 1) * (n - 2))
@@ -112,21 +94,23 @@ def load_true_betweenness(file_path):
     return true_bc
 
 
-def process_graph(input_file, output_folder, c_values):
-    # Load the graph from the specified file
-    G = nx.read_graphml(input_file)
+def process_graph(input_file, output_folder, c_values, weighted=False):
+    # Load the graph from the specified file; hop counts unless weighted, then the edge weights are lengths
+    G = load_graph(input_file, weighted=weighted)  # memory-mapped from the binary cache
     graph_name = os.path.basename(input_file).split('.')[0]  # Extract graph name from the file name
     print(f"Processing graph: {graph_name}")
     
-    calculator = GraphCentralityCalculator(G, graph_name)
+    calculator = GraphCentralityCalculator(G, graph_name + WEIGHTED_SUFFIX if weighted else graph_name)
 
-    # Load true betweenness centrality values from the corresponding file
-    true_bc_file_path = os.path.join('BetweennessCentrality', f'betweenness_centrality_{graph_name}.txt')
+    # Load true betweenness centrality values from the corresponding file (the weighted one if G has weights)
+    true_bc_file_path = true_bc_path(graph_name, G.weighted)
     true_bc = load_true_betweenness(true_bc_file_path)
 
     for c in c_values:
         print(f"Calculating Betweenness Centrality for c={c}...")
         betweenness, num_SSP_dict, calculation_time = calculator.approximate_BC(c)
+        cache = calculator.shortest_paths.stats()
+        print(f"Path cache: {cache['hits']} hits, {cache['misses']} misses, {cache['entries']} sources kept")
 
         # Create output folder for the specific value of c
         c_output_folder = os.path.join(output_folder, f"Results_{c}")
@@ -138,11 +122,11 @@ def process_graph(input_file, output_folder, c_values):
         calculator.save_results_to_file(true_bc, betweenness, num_SSP_dict, c_output_folder, f"results_c{c}.txt", calculation_time)
 
 
-def process_all_graphs(input_folder, output_folder, c_values):
+def process_all_graphs(input_folder, output_folder, c_values, weighted=False):
     for file_name in os.listdir(input_folder):
         if file_name.endswith('.graphml'):  # Handle .graphml files
             file_path = os.path.join(input_folder, file_name)
-            process_graph(file_path, output_folder, c_values)
+            process_graph(file_path, output_folder, c_values, weighted)
 
 # Input and output folders, and c values to process
 input_folder = 'GraphsNetworkX'  # Folder containing the graph files
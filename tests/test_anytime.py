@@ -0,0 +1,29 @@
+import networkx as nx
+import numpy as np
+
+from anytime import running_estimates
+from csr_graph import CSRGraph
+from parallel_sampling import dependency_batches
+
+
+def test_interval_widths():
+    G = nx.connected_watts_strogatz_graph(200, 4, 0.3, seed=0)
+    graph = CSRGraph.from_networkx(G)
+    n = graph.number_of_nodes()
+    bc = nx.betweenness_centrality(G)
+    truth = np.array([bc[label] for label in graph.labels])
+    targets = np.argsort(truth)[-30:]  # like the experiments; 'normal' is optimistic for nodes rarely on a path
+    truth = truth[targets]
+
+    radii = {}
+    for bound, per_node in [('bernstein', False), ('bernstein', True), ('normal', False), ('normal', True)]:
+        snapshots = list(running_estimates(dependency_batches(graph, targets, seed=0), n, every=100,
+                                           bound=bound, max_samples=n, per_node=per_node))
+        assert [snapshot.samples for snapshot in snapshots] == [100, 200]
+        last = snapshots[-1]
+        assert ((last.lower <= truth) & (truth <= last.upper)).all()
+        radii[bound, per_node] = last.radius
+    # Same samples, so the same estimates: only the widths differ
+    assert (radii['normal', False] < radii['bernstein', False]).all()
+    assert (radii['normal', True] < radii['normal', False]).all()
+    assert (radii['bernstein', True] < radii['bernstein', False]).all()
@@ -0,0 +1,127 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from csr_graph import CSRGraph
+from dynamic_bc import DynamicBetweenness
+from exact_bc import exact_betweenness
+from pruning import PrunedGraph
+from shortest_paths import accumulate_dependencies, batch_dependencies, shortest_path_dag
+
+
+def random_graph(seed):
+    """A small connected random graph."""
+    return nx.connected_watts_strogatz_graph(40, 4, 0.3, seed=seed)
+
+
+def disconnected_graph(seed):
+    """Two random components, a path and some isolated nodes."""
+    G = nx.disjoint_union(nx.gnm_random_graph(20, 40, seed=seed), nx.gnm_random_graph(15, 25, seed=seed + 1))
+    G = nx.disjoint_union(G, nx.path_graph(4))
+    G.add_nodes_from(range(len(G), len(G) + 3))
+    return G
+
+
+def fringe_graph(seed):
+    """A random core with trees hanging off it, so most blocks are bridges or small cycles."""
+    rng = np.random.default_rng(seed)
+    G = nx.gnm_random_graph(12, 24, seed=seed)
+    for v in range(12, 45):
+        G.add_edge(v, int(rng.integers(v)))
+    for _ in range(4):  # a few cycles through the fringe
+        G.add_edge(*rng.choice(45, size=2, replace=False).tolist())
+    G.remove_edges_from(nx.selfloop_edges(G))
+    return G
+
+
+def weighted_graph(seed):
+    """A random graph with small integer weights, so many shortest paths tie."""
+    G = fringe_graph(seed)
+    rng = np.random.default_rng(seed)
+    for u, v in G.edges():
+        G[u][v]['weight'] = float(rng.integers(1, 4))
+    return G
+
+
+GRAPHS = [random_graph, disconnected_graph, fringe_graph, weighted_graph]
+SEEDS = [0, 1, 2]
+
+
+def networkx_betweenness(G, graph):
+    """nx.betweenness_centrality as an array indexed by the node ids of graph (a CSRGraph of G)."""
+    bc = nx.betweenness_centrality(G, weight='weight' if graph.weighted else None)
+    return np.array([bc[label] for label in graph.labels])
+
+
+def scale(graph):
+    n = graph.number_of_nodes()
+    return (n - 1) * (n - 2)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('make_graph', GRAPHS)
+def test_exact_betweenness(make_graph, seed):
+    G = make_graph(seed)
+    graph = CSRGraph.from_networkx(G)
+    assert graph.weighted == (make_graph is weighted_graph)
+    np.testing.assert_allclose(exact_betweenness(graph, block_size=16), networkx_betweenness(G, graph), atol=1e-12)
+
+
+@pytest.mark.parametrize('backend', ['msbfs', 'sparse', 'bfs'])
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('make_graph', [random_graph, disconnected_graph, fringe_graph])
+def test_batch_dependencies(make_graph, seed, backend):
+    if backend == 'sparse':
+        pytest.importorskip('scipy')
+    G = make_graph(seed)
+    graph = CSRGraph.from_networkx(G)
+    sources = np.arange(graph.number_of_nodes())
+    rows = batch_dependencies(graph, sources, width=16, backend=backend)  # several groups of sources
+    for s in (0, 7, graph.number_of_nodes() - 1):
+        np.testing.assert_allclose(rows[s], accumulate_dependencies(shortest_path_dag(graph, s)), atol=1e-12)
+    np.testing.assert_allclose(rows.sum(axis=0) / scale(graph), networkx_betweenness(G, graph), atol=1e-12)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('make_graph', GRAPHS)
+def test_pruned_dependencies(make_graph, seed):
+    G = make_graph(seed)
+    graph = CSRGraph.from_networkx(G)
+    pruned = PrunedGraph(graph)
+    targets = np.arange(graph.number_of_nodes())
+    total = np.zeros(graph.number_of_nodes())
+    for x in range(graph.number_of_nodes()):
+        delta = pruned.dependencies(x, targets)
+        np.testing.assert_allclose(delta, accumulate_dependencies(shortest_path_dag(graph, x)), atol=1e-9)
+        total += delta
+    np.testing.assert_allclose(total / scale(graph), networkx_betweenness(G, graph), atol=1e-12)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('make_graph', GRAPHS)
+def test_dynamic_betweenness(make_graph, seed):
+    G = make_graph(seed)
+    graph = CSRGraph.from_networkx(G)
+    n = graph.number_of_nodes()
+    dynamic = DynamicBetweenness(graph, np.arange(n))
+    rng = np.random.default_rng(seed)
+    for _ in range(25):
+        u, v = rng.choice(n, size=2, replace=False).tolist()
+        if dynamic.graph.has_edge(u, v):
+            dynamic.remove_edge(u, v)
+            G.remove_edge(graph.labels[u], graph.labels[v])
+        else:
+            weight = float(rng.integers(1, 4)) if graph.weighted else None
+            dynamic.add_edge(u, v, weight)
+            G.add_edge(graph.labels[u], graph.labels[v], **({} if weight is None else {'weight': weight}))
+        np.testing.assert_allclose(dynamic.betweenness(), networkx_betweenness(G, graph), atol=1e-12)
+    assert dynamic.repaired + dynamic.recomputed > 0
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('make_graph', [random_graph, disconnected_graph, fringe_graph])
+def test_zero_betweenness(make_graph, seed):
+    G = make_graph(seed)
+    graph = CSRGraph.from_networkx(G)
+    # Unweighted, the nodes whose neighbours are all adjacent are exactly the ones with BC 0
+    np.testing.assert_array_equal(graph.zero_betweenness(), networkx_betweenness(G, graph) == 0)
@@ -0,0 +1,20 @@
+import os
+
+from exact_bc import calculate_and_save_betweenness
+from true_bc import load_true_betweenness
+
+
+def test_graph_without_edges(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the graph cache goes to ./GraphCache
+    (tmp_path / 'empty.txt').write_text('# no edges\n')
+    calculate_and_save_betweenness('empty.txt', 'Empty', 'out')
+    assert os.listdir('out') == ['betweenness_centrality_Empty.txt']
+
+
+def test_checkpoint_is_removed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'path.txt').write_text('1 2\n2 3\n3 4\n')
+    calculate_and_save_betweenness('path.txt', 'Path', 'out', block_size=2)
+    assert os.listdir('out') == ['betweenness_centrality_Path.txt']
+    true_bc = load_true_betweenness(os.path.join('out', 'betweenness_centrality_Path.txt'))
+    assert dict(true_bc) == {'1': 0.0, '2': 2 / 3, '3': 2 / 3, '4': 0.0}
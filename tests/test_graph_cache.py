@@ -0,0 +1,27 @@
+import os
+
+from graph_cache import load_graph
+
+
+def test_same_file_name_in_different_folders(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    paths = []
+    for folder, text in (('a', '1 2\n2 3\n'), ('b', '1 2\n')):
+        os.makedirs(tmp_path / folder)
+        path = tmp_path / folder / 'graph.txt'
+        path.write_text(text)
+        paths.append(str(path))
+
+    for _ in range(2):  # the second round reads the cached copies
+        assert [load_graph(path, cache_dir).number_of_edges() for path in paths] == [2, 1]
+    assert len([entry for entry in os.listdir(cache_dir) if not entry.endswith('.json')]) == 2
+
+
+def test_changed_file_gets_a_fresh_entry(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    path = tmp_path / 'graph.txt'
+    path.write_text('1 2\n')
+    assert load_graph(str(path), cache_dir).number_of_edges() == 1
+    path.write_text('1 2\n2 3\n3 4\n')
+    assert load_graph(str(path), cache_dir).number_of_edges() == 3
+    assert len([entry for entry in os.listdir(cache_dir) if not entry.endswith('.json')]) == 1
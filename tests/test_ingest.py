@@ -0,0 +1,42 @@
+import numpy as np
+
+from ingest import load_csr
+
+
+def edges_of(graph):
+    """The edges of a CSRGraph as a set of sorted label pairs."""
+    src = np.repeat(np.arange(graph.number_of_nodes()), graph.degrees())
+    return {tuple(sorted((graph.labels[u], graph.labels[v]))) for u, v in zip(src.tolist(), graph.indices.tolist())}
+
+
+def test_edge_list_with_indented_lines(tmp_path):
+    path = tmp_path / 'graph.txt'
+    path.write_text('1\t2\n 2\t3\n3 4\n')
+    assert edges_of(load_csr(str(path))) == {('1', '2'), ('2', '3'), ('3', '4')}
+
+
+def test_indented_crlf_matrix_market(tmp_path):
+    path = tmp_path / 'graph.mtx'
+    path.write_bytes(b'%%MatrixMarket matrix coordinate pattern symmetric\r\n'
+                     b'  % a comment\r\n'
+                     b'  4 4 3\r\n'
+                     b'  2 1\r\n'
+                     b'\t3 2\r\n'
+                     b'  4 3\r\n')
+    graph = load_csr(str(path))
+    assert graph.number_of_nodes() == 4
+    assert edges_of(graph) == {('1', '2'), ('2', '3'), ('3', '4')}
+
+
+def test_matrix_market_without_banner_keeps_first_line(tmp_path):
+    path = tmp_path / 'graph.mtx'
+    path.write_text(' 1 2\n2 3\n')
+    assert edges_of(load_csr(str(path))) == {('1', '2'), ('2', '3')}
+
+
+def test_indented_dimacs_arcs(tmp_path):
+    path = tmp_path / 'graph.gr'
+    path.write_bytes(b'c comment\r\np sp 3 4\r\n a 1 2 5\r\na 2 1 5\r\n  a 2 3 7\r\na 3 2 7\r\n')
+    graph = load_csr(str(path))
+    assert edges_of(graph) == {('1', '2'), ('2', '3')}
+    assert sorted(graph.weights.tolist()) == [5, 5, 7, 7]
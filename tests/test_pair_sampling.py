@@ -0,0 +1,24 @@
+import networkx as nx
+import numpy as np
+
+from csr_graph import CSRGraph
+from pair_sampling import PAIR_HITS, pair_batches, pair_stopping_rule
+from parallel_sampling import run_adaptive_multi
+
+
+def test_pair_stopping_rule():
+    G = nx.connected_watts_strogatz_graph(60, 4, 0.3, seed=0)
+    graph = CSRGraph.from_networkx(G)
+    n = graph.number_of_nodes()
+    bc = nx.betweenness_centrality(G)
+    truth = np.array([bc[label] for label in graph.labels])
+    targets = np.argsort(truth)[-10:]
+
+    thresholds, max_samples = pair_stopping_rule([2, 4], n)
+    S, k, _ = run_adaptive_multi(pair_batches(graph, targets, seed=0), len(targets), thresholds, max_samples)
+    hits = S / (n - 1)
+    # Every node waits for PAIR_HITS * c paths through it, unless the cap came first
+    assert ((hits >= PAIR_HITS * np.array([[2], [4]])) | (k == max_samples)).all()
+    estimate = S / k * n / ((n - 1) * (n - 2))
+    error = np.abs(estimate - truth[targets]) / truth[targets]
+    assert error.mean(axis=1).max() < 0.3
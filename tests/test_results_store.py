@@ -0,0 +1,22 @@
+import numpy as np
+
+from results_store import averaged_top_nodes, load_results, part_path, write_part
+
+
+def test_ssp_ratio_is_averaged_as_written(tmp_path):
+    store = str(tmp_path)
+    for rep, num_ssp in enumerate((1001, 1002, 1002)):
+        write_part(store, 'G', 2, rep, ['a'], [3], [0.5], [[0.4], [0.4], [0.4]], [num_ssp], 1095, 1.0)
+    averages = averaged_top_nodes(['G'], [2], store=store)
+    # The result files hold 0.914155, 0.915068 and 0.915068, not the unrounded ratios
+    assert averages['ssp_ratio'].tolist() == [(0.914155 + 0.915068 + 0.915068) / 3]
+
+
+def test_parts_without_ssp_ratio_column(tmp_path):
+    store = str(tmp_path)
+    write_part(store, 'G', 2, 0, ['a', 'b'], [3, 1], [0.5, 0.0], [[0.4, 0.0]] * 3, [1001, 0], 1095, 1.0)
+    path = part_path(store, 'G', 2, 0)
+    with np.load(path) as part:
+        columns = {column: part[column] for column in part.files if column != 'ssp_ratio'}
+    np.savez(path, **columns)
+    assert load_results(store, variant='Results')['ssp_ratio'].tolist() == [0.914155, 0.0]
@@ -0,0 +1,94 @@
+import os
+from collections.abc import Mapping
+
+import numpy as np
+
+from graph_cache import CACHE_DIR, cache_entry, publish_entry, temp_entry
+
+TRUE_BC_DIR = 'BetweennessCentrality'  # Folder holding the exact betweenness of every graph
+WEIGHTED_SUFFIX = '-weighted'  # added to the graph name of runs, and true BC files, that use the edge weights
+
+
+def true_bc_path(graph_name, weighted=False):
+    """Path of a graph's true BC file; the hop-count one, or with weighted the one using the edge weights."""
+    if weighted:
+        graph_name += WEIGHTED_SUFFIX
+    return os.path.join(TRUE_BC_DIR, f'betweenness_centrality_{graph_name}.txt')
+
+
+class TrueBetweenness(Mapping):
+    """Exact betweenness values of one graph, stored as an array in the file's node order.
+
+    Behaves like the {node: value} dict load_true_betweenness used to return, but the values
+    stay in one (memory-mapped) array, so whole-graph queries such as top_k never touch
+    Python objects per node.
+    """
+
+    def __init__(self, labels, bc):
+        self.labels = labels
+        self.bc = bc
+        self._label_to_id = None
+
+    @property
+    def label_to_id(self):
+        if self._label_to_id is None:  # built on first lookup, many scripts only need top_k
+            self._label_to_id = {label: i for i, label in enumerate(self.labels)}
+        return self._label_to_id
+
+    def __getitem__(self, node):
+        return float(self.bc[self.label_to_id[node]])
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def top_k(self, k):
+        """The k nodes with the highest betweenness, highest first.
+
+        argpartition finds them in O(n); only those k are sorted. Ties keep the file order, as
+        sorted(true_bc, key=true_bc.get, reverse=True)[:k] would.
+        """
+        k = min(k, len(self.bc))
+        if k == 0:
+            return []
+        candidates = np.argpartition(-self.bc, k - 1)[:k]
+        threshold = self.bc[candidates].min()
+        candidates = np.flatnonzero(self.bc >= threshold)  # every tie at the cut-off, to break ties by position
+        top = candidates[np.lexsort((candidates, -self.bc[candidates]))][:k]
+        return [self.labels[i] for i in top.tolist()]
+
+    def aligned(self, graph):
+        """The values as an array indexed by the node ids of a CSRGraph (0 for nodes not in the file)."""
+        labels = np.array(self.labels, dtype=str)
+        order = np.argsort(labels)
+        graph_labels = np.array(graph.labels, dtype=str)
+        position = np.searchsorted(labels[order], graph_labels).clip(max=len(labels) - 1)
+        found = labels[order][position] == graph_labels
+        return np.where(found, self.bc[order][position], 0.0)
+
+
+def parse_true_betweenness(file_path):
+    """Read a Node/BetweennessCentrality file into a label list and a float array."""
+    table = np.loadtxt(file_path, dtype=str, delimiter='\t', skiprows=1, ndmin=2)
+    return table[:, 0].tolist(), table[:, 1].astype(np.float64)
+
+
+def load_true_betweenness(file_path, cache_dir=CACHE_DIR):
+    """Load a true betweenness file through the binary cache.
+
+    The text file is only parsed the first time (or after it changed); later loads
+    memory-map the stored arrays.
+    """
+    entry = cache_entry(file_path, cache_dir)
+    if not os.path.isdir(entry):
+        labels, bc = parse_true_betweenness(file_path)
+        tmp = temp_entry(entry)
+        np.save(os.path.join(tmp, 'bc.npy'), bc)
+        np.save(os.path.join(tmp, 'labels.npy'), np.array(labels, dtype=str))
+        publish_entry(tmp, entry)
+        print(f"Cached {file_path} in {entry}")
+    bc = np.load(os.path.join(entry, 'bc.npy'), mmap_mode='r')
+    labels = np.load(os.path.join(entry, 'labels.npy'), mmap_mode='r').tolist()
+    return TrueBetweenness(labels, bc)